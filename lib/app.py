@@ -2,42 +2,93 @@
 Unified Flask API for Exercise Detection Application.
 Consolidates all routes and endpoints into a single application.
 """
-from flask import Flask, jsonify, request
+from flask import Flask, Response, abort, jsonify, request
 from flask_cors import CORS
-import threading
+import atexit
 import logging
+import time
 from datetime import datetime
 import config
+import engine
+import events
+import landmarks
+import metrics
+import pose_pool
+import sessions
+import sources
+import streaming
 
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)  # Enable CORS for Flutter app
+# Limits every request body; see read_body for chunked uploads
+app.config['MAX_CONTENT_LENGTH'] = config.INGEST_MAX_BYTES
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Global state for tracking active exercise
-active_exercise = {
-    'type': None,
-    'thread': None,
-    'running': False,
-    'start_time': None,
-    'rep_count': 0
+# Detection sessions, one per camera/station; the pooled Pose instances are
+# closed after the sessions have stopped
+session_manager = sessions.SessionManager()
+atexit.register(lambda: pose_pool.get_pool().close())
+atexit.register(session_manager.shutdown)
+
+# Background preloading of MediaPipe and the audio clips (POST /warmup)
+warm_up = engine.WarmUp()
+if config.WARMUP_ON_START:
+    warm_up.start()
+
+# Display titles of the single-exercise endpoints
+EXERCISE_TITLES = {
+    'lateral_raises': 'Lateral Raises',
+    'shoulder_press': 'Shoulder Press',
+    'crunches': 'Crunches',
+    'bicep_curls': 'Bicep Curl',
 }
 
-# Import exercise modules
-try:
-    import exercises.bicep as bicep_module
-    import exercises.lateral_raises as lateral_raises_module
-    import exercises.shoulder as shoulder_module
-    import exercises.crunches as crunches_module
-except ImportError:
-    # Fallback to old module structure
-    import bicep as bicep_module
-    import lateral_raises as lateral_raises_module
-    import shoulder as shoulder_module
-    import crunches as crunches_module
+
+def read_body():
+    """
+    Read the request body, aborting with 413 when it is over MAX_CONTENT_LENGTH.
+
+    Flask rejects bodies with a larger Content-Length itself, but chunked
+    uploads are cut off at the limit, so a body without a Content-Length that
+    fills it is rejected here.
+    """
+    data = request.get_data(cache=False)
+    if request.content_length is None and len(data) >= config.INGEST_MAX_BYTES:
+        abort(413)
+    return data
+
+
+def request_body():
+    """
+    Get the JSON body as a dict; a missing or unparsable body is empty.
+
+    Aborts with 400 if the body is valid JSON but not an object.
+    """
+    body = request.get_json(silent=True)
+    if body is None:
+        return {}
+    if not isinstance(body, dict):
+        abort(400, description="The JSON body must be an object")
+    return body
+
+
+def request_session_id():
+    """Get the session ID from the query string or JSON body."""
+    body = request_body()
+    return request.args.get('session_id') or body.get('session_id') or sessions.DEFAULT_SESSION_ID
+
+
+def request_source():
+    """Get the camera index or video path from the query string or JSON body."""
+    body = request_body()
+    source = request.args.get('source', body.get('source'))
+    if isinstance(source, str) and source.isdigit():
+        return int(source)
+    return source
 
 
 @app.route('/')
@@ -47,9 +98,12 @@ def home():
         "message": "Welcome to the Exercise Detection API",
         "version": "1.0.0",
         "endpoints": {
-            "exercises": ["/lateral_raises", "/shoulder_press", "/crunches", "/bicep_curls"],
-            "control": ["/status", "/stop"],
-            "health": ["/health"]
+            "exercises": ["/lateral_raises", "/shoulder_press", "/crunches", "/bicep_curls", "/auto"],
+            "sessions": ["/sessions", "/sessions/<session_id>", "/sessions/<session_id>/events",
+                         "/sessions/<session_id>/video", "/sessions/<session_id>/frames",
+                         "/sessions/<session_id>/landmarks"],
+            "control": ["/status", "/stop", "/events", "/video", "/frames", "/landmarks"],
+            "health": ["/health", "/metrics", "/warmup"]
         }
     }), 200
 
@@ -60,145 +114,400 @@ def health_check():
     return jsonify({
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "active_exercise": active_exercise['type'],
-        "running": active_exercise['running']
+        "active_sessions": session_manager.active_count(),
+        "max_sessions": session_manager.max_sessions,
+        "landmark_sessions": session_manager.landmark_count(),
+        "pose_pool": pose_pool.get_pool().stats()
     }), 200
 
 
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Per-stage latency quantiles, FPS and dropped frames of running sessions, in Prometheus format."""
+    return Response(metrics.render(session_manager), mimetype=metrics.CONTENT_TYPE)
+
+
+@app.route('/warmup', methods=['GET', 'POST'])
+def warmup():
+    """
+    Preload the Pose graph and audio clips in the background (POST), so the
+    first exercise starts without the load delay, or get the warm-up state (GET).
+    """
+    if request.method == 'POST':
+        warm_up.start()
+        return jsonify(warm_up.status()), 202
+    return jsonify(warm_up.status()), 200
+
+
 @app.route('/status', methods=['GET'])
 def get_status():
-    """Get current exercise status."""
+    """Get current exercise status of a session (default session if no ID given)."""
+    session = session_manager.get(request_session_id())
+    if session is None:
+        return jsonify({
+            "active_exercise": None,
+            "running": False,
+            "rep_count": 0,
+            "start_time": None
+        }), 200
+
+    status = session.status()
     return jsonify({
-        "active_exercise": active_exercise['type'],
-        "running": active_exercise['running'],
-        "rep_count": active_exercise['rep_count'],
-        "start_time": active_exercise['start_time'].isoformat() if active_exercise['start_time'] else None
+        **status,
+        "active_exercise": status['exercise'] if status['running'] else None
     }), 200
 
 
+def stop_session_response(session_id, not_running_response):
+    """
+    Stop a session and build the API response for it.
+
+    Responds 200 once the session has released its camera and model, or 202
+    if it is still shutting down after config.SESSION_STOP_TIMEOUT.
+    """
+    start = time.perf_counter()
+    stopped = session_manager.stop(session_id)
+    if stopped is None:
+        return not_running_response
+    session, clean = stopped
+    status = session.status()
+
+    return jsonify({
+        "status": "Exercise stopped" if clean else "Stop requested; session is still shutting down",
+        "session_id": session.id,
+        "exercise": status['exercise'],
+        "final_rep_count": status['rep_count'],
+        "stopped": clean,
+        "stop_ms": round((time.perf_counter() - start) * 1000.0, 1)
+    }), 200 if clean else 202
+
+
 @app.route('/stop', methods=['POST'])
 def stop_exercise():
-    """Stop the currently running exercise."""
-    if not active_exercise['running']:
-        return jsonify({
-            "status": "No exercise is currently running"
-        }), 400
-    
-    active_exercise['running'] = False
-    exercise_type = active_exercise['type']
-    active_exercise['type'] = None
-    active_exercise['start_time'] = None
-    
-    logger.info(f"Stopped exercise: {exercise_type}")
-    
-    return jsonify({
-        "status": "Exercise stopped",
-        "exercise": exercise_type,
-        "final_rep_count": active_exercise['rep_count']
-    }), 200
+    """Stop a session's exercise (default session if no ID given)."""
+    return stop_session_response(request_session_id(), (jsonify({
+        "status": "No exercise is currently running"
+    }), 400))
 
 
-def start_exercise_thread(exercise_type, exercise_function):
-    """Helper function to start an exercise in a separate thread."""
-    if active_exercise['running']:
-        logger.warning(f"Exercise {active_exercise['type']} is already running")
-        return False
-    
-    active_exercise['type'] = exercise_type
-    active_exercise['running'] = True
-    active_exercise['start_time'] = datetime.now()
-    active_exercise['rep_count'] = 0
-    
-    thread = threading.Thread(target=exercise_function, daemon=True)
-    active_exercise['thread'] = thread
-    thread.start()
-    
-    logger.info(f"Started exercise: {exercise_type}")
-    return True
+def request_record():
+    """Get whether to record the session from the query string or JSON body."""
+    body = request_body()
+    record = request.args.get('record', body.get('record', False))
+    if isinstance(record, str):
+        return record.lower() in ('1', 'true', 'yes')
+    return bool(record)
 
 
-@app.route('/lateral_raises', methods=['POST'])
-def lateral_raises_endpoint():
-    """Start lateral raises detection."""
+def start_session_response(exercise_type, title, session_id=None, source=None, record=False):
+    """Start a session and build the API response for it."""
     try:
-        if not start_exercise_thread('lateral_raises', lateral_raises_module.lateral_raises):
-            return jsonify({
-                "error": "Another exercise is already running"
-            }), 409
-        
+        session = session_manager.start(exercise_type, source, session_id, record)
+    except sessions.InvalidSessionIdError as e:
         return jsonify({
-            "status": "Lateral Raises Detection started",
-            "message": "Position yourself in front of the camera"
-        }), 200
+            "error": "Invalid session ID",
+            "message": str(e)
+        }), 400
+    except sessions.InvalidSourceError as e:
+        return jsonify({
+            "error": "Invalid source",
+            "message": str(e)
+        }), 400
+    except sessions.SessionConflictError as e:
+        return jsonify({
+            "error": "Another exercise is already running",
+            "message": str(e)
+        }), 409
+    except sessions.SessionLimitError as e:
+        return jsonify({
+            "error": "Too many sessions",
+            "message": str(e)
+        }), 503
     except Exception as e:
-        logger.error(f"Error starting lateral raises: {str(e)}", exc_info=True)
+        logger.error(f"Error starting {title}: {str(e)}", exc_info=True)
         return jsonify({
-            "error": "Failed to start lateral raises detection",
+            "error": f"Failed to start {title}",
             "message": str(e)
         }), 500
 
+    return jsonify({
+        "status": f"{title} started",
+        "session_id": session.id,
+        "recording": str(session.recorder.path) if session.recorder else None,
+        "message": "Position yourself in front of the camera"
+    }), 200
+
+
+@app.route('/lateral_raises', methods=['POST'])
+def lateral_raises_endpoint():
+    """Start lateral raises detection."""
+    return start_session_response('lateral_raises', 'Lateral Raises Detection',
+                                  request_session_id(), request_source(), request_record())
+
 
 @app.route('/shoulder_press', methods=['POST'])
 def shoulder_press_endpoint():
     """Start shoulder press detection."""
-    try:
-        if not start_exercise_thread('shoulder_press', shoulder_module.shoulder_press):
-            return jsonify({
-                "error": "Another exercise is already running"
-            }), 409
-        
-        return jsonify({
-            "status": "Shoulder Press Detection started",
-            "message": "Position yourself in front of the camera"
-        }), 200
-    except Exception as e:
-        logger.error(f"Error starting shoulder press: {str(e)}", exc_info=True)
-        return jsonify({
-            "error": "Failed to start shoulder press detection",
-            "message": str(e)
-        }), 500
+    return start_session_response('shoulder_press', 'Shoulder Press Detection',
+                                  request_session_id(), request_source(), request_record())
 
 
 @app.route('/crunches', methods=['POST'])
 def crunches_endpoint():
     """Start crunches detection."""
-    try:
-        if not start_exercise_thread('crunches', crunches_module.crunches):
-            return jsonify({
-                "error": "Another exercise is already running"
-            }), 409
-        
-        return jsonify({
-            "status": "Crunches Detection started",
-            "message": "Position yourself in front of the camera"
-        }), 200
-    except Exception as e:
-        logger.error(f"Error starting crunches: {str(e)}", exc_info=True)
-        return jsonify({
-            "error": "Failed to start crunches detection",
-            "message": str(e)
-        }), 500
+    return start_session_response('crunches', 'Crunches Detection',
+                                  request_session_id(), request_source(), request_record())
 
 
 @app.route('/bicep_curls', methods=['POST'])
 def bicep_curls_endpoint():
     """Start bicep curls detection."""
+    return start_session_response('bicep_curls', 'Bicep Curl Detection',
+                                  request_session_id(), request_source(), request_record())
+
+
+@app.route('/auto', methods=['POST'])
+def auto_endpoint():
+    """Start detection of all exercises on one camera, showing the one being performed."""
+    return start_session_response(config.AUTO_DETECT['exercises'], 'Exercise Auto-Detection',
+                                  request_session_id(), request_source(), request_record())
+
+
+@app.route('/sessions', methods=['GET'])
+def list_sessions():
+    """List all sessions."""
+    return jsonify({
+        "sessions": [session.status() for session in session_manager.list()],
+        "active_sessions": session_manager.active_count(),
+        "max_sessions": session_manager.max_sessions
+    }), 200
+
+
+@app.route('/sessions', methods=['POST'])
+def create_session():
+    """
+    Start a session.
+
+    JSON body: exercise (exercise type or 'auto'), optional source (camera
+    index or video path), optional session_id and optional record flag.
+    """
+    body = request_body()
+    exercise_type = body.get('exercise')
+    if exercise_type == 'auto':
+        return start_session_response(config.AUTO_DETECT['exercises'], 'Exercise Auto-Detection',
+                                      body.get('session_id'), request_source(), request_record())
+    if exercise_type not in EXERCISE_TITLES:
+        return jsonify({
+            "error": "Unknown exercise",
+            "message": f"exercise must be one of {sorted(EXERCISE_TITLES) + ['auto']}"
+        }), 400
+    return start_session_response(exercise_type, f"{EXERCISE_TITLES[exercise_type]} Detection",
+                                  body.get('session_id'), request_source(), request_record())
+
+
+@app.route('/sessions/<session_id>', methods=['GET'])
+def get_session(session_id):
+    """Get a session's status."""
+    session = session_manager.get(session_id)
+    if session is None:
+        return jsonify({
+            "error": "Session not found"
+        }), 404
+    return jsonify(session.status()), 200
+
+
+@app.route('/sessions/<session_id>', methods=['DELETE'])
+def delete_session(session_id):
+    """Stop a session."""
+    return stop_session_response(session_id, (jsonify({
+        "error": "Session not found or not running"
+    }), 404))
+
+
+def event_stream_response(session_id):
+    """Stream a session's events as Server-Sent Events."""
+    session = session_manager.get(session_id)
+    if session is None:
+        return jsonify({
+            "error": "Session not found"
+        }), 404
+
+    telemetry_hz = request.args.get('telemetry', 0.0, type=float)
+    stream = events.stream(session.snapshots, lambda: session.state == 'running', telemetry_hz)
+    return Response(stream, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+@app.route('/events', methods=['GET'])
+def stream_events():
+    """Stream rep, stage and form-error events of a session (default session if no ID given)."""
+    return event_stream_response(request_session_id())
+
+
+@app.route('/sessions/<session_id>/events', methods=['GET'])
+def stream_session_events(session_id):
+    """Stream rep, stage and form-error events of a session."""
+    return event_stream_response(session_id)
+
+
+def video_stream_response(session_id):
+    """Stream a session's annotated frames as MJPEG."""
+    session = session_manager.get(session_id)
+    if session is None or session.state != 'running':
+        return jsonify({
+            "error": "Session not found or not running"
+        }), 404
+    if session.video is None:
+        return jsonify({
+            "error": "Session has no video",
+            "message": "Landmark sessions receive no frames"
+        }), 409
+
+    return Response(session.video.stream(), mimetype=streaming.MIMETYPE, headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+@app.route('/video', methods=['GET'])
+def stream_video():
+    """Stream the annotated video of a session (default session if no ID given)."""
+    return video_stream_response(request_session_id())
+
+
+@app.route('/sessions/<session_id>/video', methods=['GET'])
+def stream_session_video(session_id):
+    """Stream the annotated video of a session."""
+    return video_stream_response(session_id)
+
+
+def ingest_frames_response(session_id):
+    """
+    Queue frames pushed by a client into a session started with source 'push'.
+
+    Accepts one encoded image (Content-Type image/jpeg, image/png, ...), one
+    raw BGR frame (application/octet-stream with width and height query
+    parameters) or a batch of encoded images (application/x-frame-batch,
+    each prefixed with its 4-byte big-endian length). Frames are processed
+    asynchronously, so the response carries the session's latest results
+    and the latency of the most recently processed frame.
+    """
+    session = session_manager.get(session_id)
+    if session is None or session.state != 'running':
+        return jsonify({
+            "error": "Session not found or not running"
+        }), 404
+    if session.push_source is None:
+        return jsonify({
+            "error": "Session does not accept frames",
+            "message": f"Start the session with source '{sources.PUSH_SOURCE}'"
+        }), 409
+    data = read_body()
+    content_type = request.mimetype
     try:
-        if not start_exercise_thread('bicep_curls', bicep_module.bicep_curl_detection):
+        if content_type == 'application/x-frame-batch':
+            frame_id = None
+            for frame in sources.split_frame_batch(data):
+                frame_id = session.push_source.push(frame)
+        elif content_type == 'application/octet-stream':
+            shape = (request.args.get('height', 0, type=int), request.args.get('width', 0, type=int))
+            frame_id = session.push_source.push(data, 'raw', shape)
+        elif content_type.startswith('image/'):
+            frame_id = session.push_source.push(data)
+        else:
             return jsonify({
-                "error": "Another exercise is already running"
-            }), 409
-        
+                "error": "Unsupported frame format",
+                "message": "Send image/*, application/octet-stream or application/x-frame-batch"
+            }), 415
+    except ValueError as e:
         return jsonify({
-            "status": "Bicep Curl Detection started",
-            "message": "Position yourself in front of the camera"
-        }), 200
-    except Exception as e:
-        logger.error(f"Error starting bicep curls: {str(e)}", exc_info=True)
+            "error": "Invalid frame",
+            "message": str(e)
+        }), 400
+
+    return jsonify({
+        **session.status(),
+        "frame_id": frame_id,
+        "frames_received": session.push_source.received,
+        "frames_dropped": session.push_source.dropped
+    }), 202
+
+
+@app.route('/frames', methods=['POST'])
+def ingest_frames():
+    """Push camera frames to a session (default session if no ID given)."""
+    return ingest_frames_response(request_session_id())
+
+
+@app.route('/sessions/<session_id>/frames', methods=['POST'])
+def ingest_session_frames(session_id):
+    """Push camera frames to a session."""
+    return ingest_frames_response(session_id)
+
+
+def ingest_landmarks_response(session_id):
+    """
+    Count landmark frames pushed by a client into a session started with
+    source 'landmarks'.
+
+    The body holds one or more frames of 33 x 4 (x, y, z, visibility)
+    little-endian float32 values, or float16 with ?dtype=float16; a frame of
+    NaNs means no pose. Frames are counted before responding, so the
+    response carries the results of the last frame sent.
+    """
+    session = session_manager.get(session_id)
+    if session is None or session.state != 'running':
+        return jsonify({
+            "error": "Session not found or not running"
+        }), 404
+    if not isinstance(session, sessions.LandmarkSession):
+        return jsonify({
+            "error": "Session does not accept landmarks",
+            "message": f"Start the session with source '{sessions.LANDMARK_SOURCE}'"
+        }), 409
+
+    try:
+        frames = landmarks.unpack_frames(read_body(), request.args.get('dtype', 'float32'))
+    except ValueError as e:
         return jsonify({
-            "error": "Failed to start bicep curl detection",
+            "error": "Invalid landmarks",
             "message": str(e)
-        }), 500
+        }), 400
+    if len(frames) > config.INGEST_MAX_LANDMARK_FRAMES:
+        return jsonify({
+            "error": "Upload too large",
+            "message": f"At most {config.INGEST_MAX_LANDMARK_FRAMES} landmark frames per request"
+        }), 413
+
+    reps = session.update(frames)
+    return jsonify({
+        **session.status(),
+        "frames_counted": len(frames),
+        "reps_completed": reps
+    }), 200
+
+
+@app.route('/landmarks', methods=['POST'])
+def ingest_landmarks():
+    """Push landmark frames to a session (default session if no ID given)."""
+    return ingest_landmarks_response(request_session_id())
+
+
+@app.route('/sessions/<session_id>/landmarks', methods=['POST'])
+def ingest_session_landmarks(session_id):
+    """Push landmark frames to a session."""
+    return ingest_landmarks_response(session_id)
+
+
+@app.errorhandler(400)
+def bad_request(error):
+    """Handle malformed requests."""
+    return jsonify({
+        "error": "Bad request",
+        "message": error.description
+    }), 400
 
 
 @app.errorhandler(404)
@@ -210,6 +519,15 @@ def not_found(error):
     }), 404
 
 
+@app.errorhandler(413)
+def too_large(error):
+    """Handle request bodies over MAX_CONTENT_LENGTH."""
+    return jsonify({
+        "error": "Upload too large",
+        "message": f"Uploads are limited to {config.INGEST_MAX_BYTES} bytes"
+    }), 413
+
+
 @app.errorhandler(500)
 def internal_error(error):
     """Handle 500 errors."""
@@ -227,4 +545,3 @@ if __name__ == '__main__':
         port=config.FLASK_PORT,
         debug=config.FLASK_DEBUG
     )
-
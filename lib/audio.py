@@ -0,0 +1,242 @@
+"""
+Audio feedback.
+Decodes each clip once per process and plays cues from a single audio
+thread fed by a bounded priority queue, so detection loops never touch the
+disk, the decoder or the mixer. Headless servers can swap pygame for a
+no-op or recording backend.
+"""
+import heapq
+import itertools
+import logging
+import threading
+import time
+import config
+import utils
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('pygame', 'null', 'record')
+
+
+class NullBackend:
+    """Backend that plays nothing, for headless servers."""
+
+    name = 'null'
+
+    def load(self, name):
+        """
+        Decode a clip into memory.
+
+        Returns:
+            True if the clip can be played
+        """
+        return True
+
+    def play(self, name):
+        pass
+
+    def stop(self):
+        pass
+
+
+class RecordingBackend(NullBackend):
+    """Backend that only records which cues were played and when."""
+
+    name = 'record'
+
+    def __init__(self):
+        self.played = []
+
+    def play(self, name):
+        self.played.append((time.monotonic(), name))
+
+
+class PygameBackend:
+    """Backend mixing pygame Sounds, decoded once and kept in memory."""
+
+    name = 'pygame'
+
+    def __init__(self):
+        """
+        Raises:
+            RuntimeError: If the audio device cannot be opened
+        """
+        try:
+            import pygame
+        except ImportError as e:
+            raise RuntimeError(f"Could not initialize audio: {e}") from e
+        self._pygame = pygame
+        try:
+            pygame.mixer.init()
+        except pygame.error as e:
+            raise RuntimeError(f"Could not initialize audio: {e}") from e
+        self._sounds = {}
+
+    def load(self, name):
+        if name not in self._sounds:
+            try:
+                self._sounds[name] = self._pygame.mixer.Sound(str(utils.get_audio_path(name)))
+            except Exception as e:
+                logger.warning(f"Could not load audio file {name}: {e}")
+                return False
+        return True
+
+    def play(self, name):
+        self._sounds[name].play()
+
+    def stop(self):
+        self._pygame.mixer.stop()
+
+
+def create_backend(name=None):
+    """
+    Create an audio backend, falling back to NullBackend if pygame fails.
+
+    Args:
+        name: 'pygame', 'null' or 'record' (default config.AUDIO_BACKEND)
+
+    Returns:
+        Backend instance
+    """
+    name = name or config.AUDIO_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown audio backend: {name}")
+    if name == 'record':
+        return RecordingBackend()
+    if name == 'pygame':
+        try:
+            return PygameBackend()
+        except Exception as e:
+            logger.warning(f"{e}. Audio feedback will be disabled.")
+    return NullBackend()
+
+
+class AudioPlayer:
+    """
+    Plays cues on a dedicated thread.
+
+    play() only checks the cue's cooldown and queues it. When the queue is
+    full, the lowest-priority cue is dropped, so urgent alerts are never
+    stuck behind minor ones.
+    """
+
+    def __init__(self, backend=None, queue_size=None, cooldown=None):
+        """
+        Args:
+            backend: Backend instance (default create_backend())
+            queue_size: Cues waiting before the least important is dropped
+                (default config.AUDIO_QUEUE_SIZE)
+            cooldown: Minimum seconds between plays of the same cue (default
+                config.AUDIO_COOLDOWN)
+        """
+        self.backend = backend or create_backend()
+        self.queue_size = queue_size or config.AUDIO_QUEUE_SIZE
+        self.cooldown = config.AUDIO_COOLDOWN if cooldown is None else cooldown
+        self.dropped = 0
+        self._loaded = set()
+        self._last_played = {}
+        self._queue = []
+        self._order = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='audio', daemon=True)
+        self._thread.start()
+
+    def load(self, names):
+        """
+        Decode clips ahead of time; clips already loaded are skipped.
+
+        Args:
+            names: Audio file names, resolved with utils.get_audio_path
+
+        Returns:
+            Set of the names that can be played
+        """
+        for name in names:
+            if name not in self._loaded and self.backend.load(name):
+                self._loaded.add(name)
+        return self._loaded.intersection(names)
+
+    def play(self, name, priority=0, key=None, now=None):
+        """
+        Queue a cue unless it played within the cooldown.
+
+        Args:
+            name: Loaded audio file name
+            priority: Higher plays first and is dropped last
+            key: Cooldown key (default name); e.g. one per session so
+                stations do not silence each other
+            now: Current time.monotonic(), if the caller has it
+
+        Returns:
+            True if the cue was queued
+        """
+        if name not in self._loaded:
+            return False
+        key = name if key is None else key
+        now = time.monotonic() if now is None else now
+        if now - self._last_played.get(key, float('-inf')) <= self.cooldown:
+            return False
+        self._last_played[key] = now
+        with self._cond:
+            if self._closed:
+                return False
+            if len(self._queue) >= self.queue_size:
+                lowest = max(self._queue)
+                if -lowest[0] >= priority:
+                    self.dropped += 1
+                    return False
+                self._queue.remove(lowest)
+                heapq.heapify(self._queue)
+                self.dropped += 1
+            heapq.heappush(self._queue, (-priority, next(self._order), name, key))
+            self._cond.notify()
+        return True
+
+    def cancel(self, keys):
+        """Drop queued cues with any of these cooldown keys, e.g. when a session ends."""
+        keys = set(keys)
+        with self._cond:
+            self._queue = [item for item in self._queue if item[3] not in keys]
+            heapq.heapify(self._queue)
+        for key in keys:
+            self._last_played.pop(key, None)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or self._closed)
+                if self._closed:
+                    return
+                _, _, name, _ = heapq.heappop(self._queue)
+            try:
+                self.backend.play(name)
+            except Exception as e:
+                logger.warning(f"Error playing audio {name}: {e}")
+
+    def close(self, timeout=1.0):
+        """Stop the audio thread and silence the backend."""
+        with self._cond:
+            self._closed = True
+            self._queue.clear()
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        self.backend.stop()
+
+
+_player = None
+_player_lock = threading.Lock()
+
+
+def get_player():
+    """
+    Get the process-wide AudioPlayer, creating it on first use.
+
+    Returns:
+        AudioPlayer shared by all detection runs
+    """
+    global _player
+    with _player_lock:
+        if _player is None:
+            _player = AudioPlayer()
+        return _player
@@ -0,0 +1,175 @@
+"""
+Multi-process batch scoring of recorded sessions.
+Shards a directory of session videos across worker processes, each with its
+own long-lived MediaPipe Pose, and streams results into one JSON Lines file.
+
+Usage:
+    python lib/batch_score.py bicep_curls sessions/ -o results.jsonl --workers 8
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+import config
+import counters
+import scheduler
+
+logger = logging.getLogger(__name__)
+
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv', '.webm'}
+
+# Per-process Pose instance, created once by _init_worker
+_pose = None
+
+
+def find_videos(directory, recursive=False):
+    """
+    List session videos in a directory.
+
+    Args:
+        directory: Directory to scan
+        recursive: Also scan subdirectories
+
+    Returns:
+        Sorted list of video paths
+    """
+    pattern = '**/*' if recursive else '*'
+    return sorted(p for p in Path(directory).glob(pattern)
+                  if p.is_file() and p.suffix.lower() in VIDEO_EXTENSIONS)
+
+
+def _init_worker(profile):
+    global _pose
+    # Imported here so that only worker processes load MediaPipe
+    import pose_pool
+    settings = pose_pool.profile_settings(profile)[0] if profile is not None else None
+    _pose = pose_pool.create_pose(settings)
+
+
+def _score_video(exercise_type, path, policy, use_cache, profile):
+    import landmark_cache
+    import score
+    start = time.perf_counter()
+    try:
+        cache = landmark_cache.LandmarkCache() if use_cache else None
+        result = score.score_source(exercise_type, path, pose=_pose, policy=policy, cache=cache, profile=profile)
+        result.pop('pipeline', None)
+    except Exception as e:
+        result = {'exercise': exercise_type, 'source': str(path), 'frames': 0, 'error': str(e)}
+    result['worker'] = os.getpid()
+    result['worker_elapsed_s'] = time.perf_counter() - start
+    return result
+
+
+class ThroughputReport:
+    """Aggregates per-worker throughput of a batch run."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.videos = 0
+        self.failed = 0
+        self.frames = 0
+        self.workers = {}
+
+    def add(self, result):
+        self.videos += 1
+        self.failed += 'error' in result
+        self.frames += result['frames']
+        stats = self.workers.setdefault(result['worker'], {'videos': 0, 'frames': 0, 'busy_s': 0.0})
+        stats['videos'] += 1
+        stats['frames'] += result['frames']
+        stats['busy_s'] += result['worker_elapsed_s']
+
+    def summary(self):
+        """
+        Returns:
+            Dict with overall videos/sec and frames/sec and per-worker frames/sec
+        """
+        elapsed = time.perf_counter() - self.start
+        return {
+            'videos': self.videos,
+            'failed': self.failed,
+            'frames': self.frames,
+            'elapsed_s': elapsed,
+            'videos_per_s': self.videos / elapsed if elapsed > 0 else 0.0,
+            'frames_per_s': self.frames / elapsed if elapsed > 0 else 0.0,
+            'workers': {
+                str(pid): {**stats, 'frames_per_s': stats['frames'] / stats['busy_s'] if stats['busy_s'] > 0 else 0.0}
+                for pid, stats in self.workers.items()
+            },
+        }
+
+
+def score_videos(exercise_type, paths, workers=None, policy=None, on_result=None, use_cache=False, profile=None):
+    """
+    Score many videos in parallel, one Pose per worker process.
+
+    Args:
+        exercise_type: Exercise type, e.g. 'bicep_curls'
+        paths: Video paths to score
+        workers: Number of worker processes (default: CPU count)
+        policy: Inference scheduling policy (default config.INFERENCE_POLICY)
+        on_result: Optional callback invoked with each result as it completes
+        use_cache: Score from (and fill) the landmark cache
+        profile: Optional key of config.PERFORMANCE_PROFILES whose Pose
+            settings and inference width the workers use; the cache is not
+            used then
+
+    Returns:
+        ThroughputReport summary dict
+    """
+    report = ThroughputReport()
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker,
+                             initargs=(profile,)) as executor:
+        futures = [executor.submit(_score_video, exercise_type, str(path), policy, use_cache, profile)
+                   for path in paths]
+        for future in as_completed(futures):
+            result = future.result()
+            report.add(result)
+            if on_result:
+                on_result(result)
+    return report.summary()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a directory of session videos in parallel")
+    parser.add_argument('exercise', choices=sorted(counters.EXERCISES), help="Exercise type")
+    parser.add_argument('directory', help="Directory of session videos")
+    parser.add_argument('-o', '--output', help="JSON Lines output file (default: stdout)")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--recursive', action='store_true', help="Include subdirectories")
+    parser.add_argument('--policy', choices=scheduler.POLICIES, default=None,
+                        help="Inference scheduling policy (default from config)")
+    parser.add_argument('--cache', action='store_true',
+                        help="Reuse (or store) extracted landmarks in the landmark cache")
+    parser.add_argument('--profile', choices=list(config.PERFORMANCE_PROFILES), default=None,
+                        help="Performance profile (default: the configured settings)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    paths = find_videos(args.directory, args.recursive)
+    if not paths:
+        logger.error(f"No videos found in {args.directory}")
+        return 1
+
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        def write(result):
+            out.write(json.dumps(result) + '\n')
+            out.flush()
+
+        summary = score_videos(args.exercise, paths, args.workers, args.policy, write, args.cache, args.profile)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print(json.dumps(summary, indent=2), file=sys.stderr)
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -13,11 +13,87 @@ FLASK_DEBUG = os.getenv('FLASK_DEBUG', 'True').lower() == 'true'
 MIN_DETECTION_CONFIDENCE = float(os.getenv('MIN_DETECTION_CONFIDENCE', 0.5))
 MIN_TRACKING_CONFIDENCE = float(os.getenv('MIN_TRACKING_CONFIDENCE', 0.5))
 
+# Performance Profiles, cheapest first
+# Each selects the MediaPipe model complexity (0-2), the width frames are
+# downscaled to before inference (0 for full size) and landmark smoothing;
+# segmentation is always off. The variables below override single values.
+# Compare the profiles on a recorded clip with lib/profile_bench.py.
+PERFORMANCE_PROFILES = {
+    'lite': {'model_complexity': 0, 'inference_width': 320, 'smooth_landmarks': True},
+    'balanced': {'model_complexity': 1, 'inference_width': 480, 'smooth_landmarks': True},
+    'accurate': {'model_complexity': 2, 'inference_width': 0, 'smooth_landmarks': True},
+}
+PERFORMANCE_PROFILE = os.getenv('PERFORMANCE_PROFILE', 'balanced')
+if PERFORMANCE_PROFILE not in PERFORMANCE_PROFILES:
+    raise ValueError(f"Unknown PERFORMANCE_PROFILE {PERFORMANCE_PROFILE!r}; "
+                     f"use one of {', '.join(PERFORMANCE_PROFILES)}")
+_profile = PERFORMANCE_PROFILES[PERFORMANCE_PROFILE]
+MODEL_COMPLEXITY = int(os.getenv('MODEL_COMPLEXITY', _profile['model_complexity']))  # 0 (fastest), 1 or 2 (most accurate)
+INFERENCE_WIDTH = int(os.getenv('INFERENCE_WIDTH', _profile['inference_width']))  # pixels; 0 for full size
+SMOOTH_LANDMARKS = os.getenv('SMOOTH_LANDMARKS', str(_profile['smooth_landmarks'])).lower() == 'true'
+
+# ROI Tracking
+# Crops each frame to the previous frame's pose, plus ROI_MARGIN of its size
+# on every side, before inference; frames are processed whole until a pose
+# is found. Saves most of the conversion and inference input work when
+# people are far from the camera.
+ROI_TRACKING = os.getenv('ROI_TRACKING', 'False').lower() == 'true'
+ROI_MARGIN = float(os.getenv('ROI_MARGIN', 0.25))
+ROI_MIN_SIZE = int(os.getenv('ROI_MIN_SIZE', 96))  # pixels
+
+# Inference Scheduling
+# 'every_frame' runs pose inference on every frame, 'fixed' on every
+# INFERENCE_SCHEDULE['interval']-th frame and 'adaptive' picks the interval
+# from measured landmark velocity. Skipped frames reuse extrapolated landmarks.
+INFERENCE_POLICY = os.getenv('INFERENCE_POLICY', 'every_frame')
+INFERENCE_SCHEDULE = {
+    'interval': int(os.getenv('INFERENCE_INTERVAL', 2)),
+    'max_interval': int(os.getenv('INFERENCE_MAX_INTERVAL', 3)),
+    # normalized units per frame; 0.06 infers on about 35-55% of the replay fixture frames
+    # with the same rep frames as every_frame
+    'velocity_threshold': float(os.getenv('INFERENCE_VELOCITY_THRESHOLD', 0.06)),
+}
+
 # Camera Configuration
 CAMERA_INDEX = int(os.getenv('CAMERA_INDEX', 0))
 
+# Detection Sessions
+# Each session drives one camera/station with its own Pose and counter.
+# Set DISPLAY_WINDOW=False on headless servers running several sessions.
+MAX_SESSIONS = int(os.getenv('MAX_SESSIONS', 4))
+DISPLAY_WINDOW = os.getenv('DISPLAY_WINDOW', 'True').lower() == 'true'
+SESSION_STOP_TIMEOUT = float(os.getenv('SESSION_STOP_TIMEOUT', 3.0))  # seconds to wait for a session to release
+MAX_STOPPED_SESSIONS = int(os.getenv('MAX_STOPPED_SESSIONS', 16))  # stopped camera/push sessions kept for GET /sessions
+MAX_LANDMARK_SESSIONS = int(os.getenv('MAX_LANDMARK_SESSIONS', 500))  # sessions fed landmarks, which run no inference
+POSE_POOL_SIZE = int(os.getenv('POSE_POOL_SIZE', MAX_SESSIONS))  # idle Pose instances kept for reuse by new sessions
+
+# Event Streaming
+EVENT_QUEUE_SIZE = int(os.getenv('EVENT_QUEUE_SIZE', 256))  # events buffered per client before dropping the oldest
+EVENT_KEEPALIVE = float(os.getenv('EVENT_KEEPALIVE', 15.0))  # seconds between keepalives on idle streams
+
+# Video Streaming (MJPEG); frames are only rendered and encoded while someone watches
+STREAM_JPEG_QUALITY = int(os.getenv('STREAM_JPEG_QUALITY', 70))  # 1-100
+STREAM_MAX_WIDTH = int(os.getenv('STREAM_MAX_WIDTH', 640))  # pixels; wider frames are downscaled, 0 for full size
+STREAM_TIMEOUT = float(os.getenv('STREAM_TIMEOUT', 5.0))  # seconds without a frame before a stream ends
+
+# Frame and Landmark Ingestion (sessions started with source 'push' or 'landmarks')
+INGEST_QUEUE_SIZE = int(os.getenv('INGEST_QUEUE_SIZE', 2))  # pushed frames buffered before the oldest is dropped
+INGEST_IDLE_TIMEOUT = float(os.getenv('INGEST_IDLE_TIMEOUT', 10.0))  # seconds without input before a push session ends
+LANDMARK_IDLE_TIMEOUT = float(os.getenv('LANDMARK_IDLE_TIMEOUT', 300.0))  # seconds; long enough to rest between sets
+INGEST_MAX_BYTES = int(os.getenv('INGEST_MAX_BYTES', 16 * 1024 * 1024))  # largest accepted request body
+INGEST_MAX_LANDMARK_FRAMES = int(os.getenv('INGEST_MAX_LANDMARK_FRAMES', 300))  # landmark frames per request
+
+# Startup: warm up MediaPipe and the audio clips in the background as soon as
+# the server starts, instead of on the first exercise or POST /warmup
+WARMUP_ON_START = os.getenv('WARMUP_ON_START', 'False').lower() == 'true'
+
+# Metrics (/metrics); latency quantiles cover the last METRICS_WINDOW/2 to METRICS_WINDOW seconds
+METRICS_WINDOW = float(os.getenv('METRICS_WINDOW', 60.0))
+
 # Audio Configuration
 AUDIO_COOLDOWN = int(os.getenv('AUDIO_COOLDOWN', 5))  # seconds between audio alerts
+AUDIO_BACKEND = os.getenv('AUDIO_BACKEND', 'pygame')  # 'pygame', 'null' (silent) or 'record' (logs cues, for tests)
+AUDIO_QUEUE_SIZE = int(os.getenv('AUDIO_QUEUE_SIZE', 8))  # cues waiting before the least important is dropped
 ERROR_DISPLAY_TIME = int(os.getenv('ERROR_DISPLAY_TIME', 3))  # seconds to display errors
 
 # Exercise Angle Thresholds
@@ -46,10 +122,36 @@ CRUNCHES = {
     'incorrect_form_angle_min': 120,
 }
 
+SQUATS = {
+    'squat_angle_max': 90,
+}
+
+TRICEP_PUSHDOWNS = {
+    'extended_angle_min': 160,
+    'folded_angle_max': 30,
+}
+
+# Multi-exercise mode: counters run side by side on one pose inference, and
+# the exercise with the most reps in the last 'window' pose frames is shown
+AUTO_DETECT = {
+    'exercises': ['bicep_curls', 'shoulder_press', 'lateral_raises', 'crunches'],
+    'window': int(os.getenv('AUTO_DETECT_WINDOW', 150)),
+}
+
 # Paths
 PROJECT_ROOT = Path(__file__).parent.parent
 AUDIO_DIR = PROJECT_ROOT / "static" / "audio"
 
-# Create audio directory if it doesn't exist
-AUDIO_DIR.mkdir(parents=True, exist_ok=True)
+# Extracted landmark tracks, keyed by video content hash and model settings
+LANDMARK_CACHE_DIR = Path(os.getenv('LANDMARK_CACHE_DIR', PROJECT_ROOT / "cache" / "landmarks"))
+
+# Session recordings (recording.py); int16 landmarks halve the file size
+RECORDING_DIR = Path(os.getenv('RECORDING_DIR', PROJECT_ROOT / "recordings"))
+RECORDING_QUANTIZE = os.getenv('RECORDING_QUANTIZE', 'True').lower() == 'true'
+
+# Replay fixtures (replay.py): landmark tracks with expected reps and form errors
+REPLAY_FIXTURE_DIR = Path(os.getenv('REPLAY_FIXTURE_DIR', PROJECT_ROOT / "fixtures" / "replay"))
+REPLAY_FPS = 30.0  # frame rate assumed for fixture tracks
+REPLAY_BENCH_REPEAT = 20  # passes over each track in benchmark mode
+
 
@@ -0,0 +1,337 @@
+"""
+Rep counting and form checking logic for each exercise.
+Exercises are declared as data (joint angles, stage rules, form checks and
+config thresholds) and all run through the same ExerciseCounter, so they
+behave the same on live camera frames, scheduled/extrapolated frames and
+recorded landmark tracks.
+"""
+import collections
+import logging
+import numpy as np
+import config
+import utils
+import landmarks
+
+logger = logging.getLogger(__name__)
+
+LEFT_SHOULDER = landmarks.JOINTS['LEFT_SHOULDER']
+RIGHT_SHOULDER = landmarks.JOINTS['RIGHT_SHOULDER']
+LEFT_WRIST = landmarks.JOINTS['LEFT_WRIST']
+RIGHT_WRIST = landmarks.JOINTS['RIGHT_WRIST']
+
+# Elbow angles followed by torso-arm angles, for both sides
+ARM_TRIPLES = landmarks.joint_triples([
+    ('LEFT_SHOULDER', 'LEFT_ELBOW', 'LEFT_WRIST'),
+    ('RIGHT_SHOULDER', 'RIGHT_ELBOW', 'RIGHT_WRIST'),
+    ('LEFT_HIP', 'LEFT_SHOULDER', 'LEFT_ELBOW'),
+    ('RIGHT_HIP', 'RIGHT_SHOULDER', 'RIGHT_ELBOW'),
+])
+
+# Torso-arm angles for both sides
+SHOULDER_TRIPLES = ARM_TRIPLES[2:]
+
+# Shoulder-hip-knee angles for both sides
+HIP_TRIPLES = landmarks.joint_triples([
+    ('LEFT_SHOULDER', 'LEFT_HIP', 'LEFT_KNEE'),
+    ('RIGHT_SHOULDER', 'RIGHT_HIP', 'RIGHT_KNEE'),
+])
+
+# Hip-knee-ankle angles for both sides
+KNEE_TRIPLES = landmarks.joint_triples([
+    ('LEFT_HIP', 'LEFT_KNEE', 'LEFT_ANKLE'),
+    ('RIGHT_HIP', 'RIGHT_KNEE', 'RIGHT_ANKLE'),
+])
+
+# A stage transition: move to stage when when(angles, thresholds) holds and,
+# if after is set, the current stage is after. The first matching rule wins.
+Rule = collections.namedtuple('Rule', ['stage', 'when', 'after'], defaults=[None])
+
+# A form error flagged while when(angles, points, thresholds) holds; message
+# is shown on screen and sound (an audio file name, or None) played.
+FormCheck = collections.namedtuple('FormCheck', ['name', 'when', 'message', 'sound'])
+
+# Declarative exercise definition. angles[k] is the angle of triples[k];
+# a rep is counted on the stage transition rep[0] -> rep[1].
+#
+# Predicates must only use element-wise operators (&, |, comparisons,
+# .min/.max(axis=0)) so they also run vectorized over many clips and
+# threshold combinations in sweep.py.
+Exercise = collections.namedtuple(
+    'Exercise', ['name', 'title', 'triples', 'thresholds', 'rules', 'rep', 'form_checks'])
+
+BICEP_CURLS = Exercise(
+    name='bicep_curls',
+    title='Bicep Curl Detection',
+    triples=ARM_TRIPLES,
+    thresholds=config.BICEP_CURL,
+    rules=(
+        Rule('down', lambda a, t: (a[:2].min(axis=0) > t['down_angle_min']) &
+                                  (a[2:].max(axis=0) < t['torso_angle_max'])),
+        Rule('up', lambda a, t: (a[:2].max(axis=0) < t['up_angle_max']) &
+                                (a[2:].max(axis=0) < t['torso_angle_max']), after='down'),
+    ),
+    rep=('down', 'up'),
+    form_checks=(
+        FormCheck('hands_too_high',
+                  lambda a, p, t: (p[LEFT_WRIST, 1] < p[LEFT_SHOULDER, 1]) &
+                                  (p[RIGHT_WRIST, 1] < p[RIGHT_SHOULDER, 1]),
+                  'HANDS TOO HIGH', 'alert.mp3'),
+    ),
+)
+
+SHOULDER_PRESS = Exercise(
+    name='shoulder_press',
+    title='Shoulder Press Detection',
+    triples=ARM_TRIPLES,
+    thresholds=config.SHOULDER_PRESS,
+    rules=(
+        Rule('pressing', lambda a, t: a.min(axis=0) > t['pressing_angle_min']),
+        Rule('lowered', lambda a, t: (a.min(axis=0) > t['lowered_angle_min']) &
+                                     (a.max(axis=0) < t['lowered_angle_max'])),
+    ),
+    rep=('lowered', 'pressing'),
+    form_checks=(
+        FormCheck('hands_too_low', lambda a, p, t: a[2:].max(axis=0) < t['hands_too_low_angle_max'],
+                  'HANDS TOO LOW', 'low_hands.mp3'),
+    ),
+)
+
+CRUNCHES = Exercise(
+    name='crunches',
+    title='Crunch Detection',
+    triples=HIP_TRIPLES,
+    thresholds=config.CRUNCHES,
+    rules=(
+        Rule('up', lambda a, t: a.max(axis=0) < t['up_angle_max']),
+        Rule('down', lambda a, t: a.min(axis=0) > t['down_angle_min']),
+    ),
+    rep=('down', 'up'),
+    form_checks=(
+        FormCheck('incorrect_form', lambda a, p, t: a.min(axis=0) > t['incorrect_form_angle_min'],
+                  'INCORRECT FORM', 'crunch_incorrect.mp3'),
+    ),
+)
+
+LATERAL_RAISES = Exercise(
+    name='lateral_raises',
+    title='Lateral Raise Detection',
+    triples=SHOULDER_TRIPLES,
+    thresholds=config.LATERAL_RAISES,
+    rules=(
+        Rule('raised', lambda a, t: a.min(axis=0) > t['raised_angle_min']),
+        Rule('lowered', lambda a, t: (a.min(axis=0) > t['lowered_angle_min']) &
+                                     (a.max(axis=0) < t['lowered_angle_max'])),
+    ),
+    rep=('lowered', 'raised'),
+    form_checks=(
+        FormCheck('arms_too_high', lambda a, p, t: a.min(axis=0) > t['raised_angle_min'],
+                  'ARMS TOO HIGH', 'arms_too_high.mp3'),
+    ),
+)
+
+SQUATS = Exercise(
+    name='squats',
+    title='Squat Detection',
+    triples=KNEE_TRIPLES,
+    thresholds=config.SQUATS,
+    rules=(
+        Rule('squatting', lambda a, t: a.max(axis=0) < t['squat_angle_max']),
+        Rule('standing', lambda a, t: True),
+    ),
+    rep=('standing', 'squatting'),
+    form_checks=(),
+)
+
+TRICEP_PUSHDOWNS = Exercise(
+    name='tricep_pushdowns',
+    title='Triceps Detection',
+    triples=ARM_TRIPLES[:2],
+    thresholds=config.TRICEP_PUSHDOWNS,
+    rules=(
+        Rule('extending', lambda a, t: a.min(axis=0) > t['extended_angle_min']),
+        Rule('contracting', lambda a, t: True),
+    ),
+    rep=('contracting', 'extending'),
+    form_checks=(
+        FormCheck('arms_folded', lambda a, p, t: a.max(axis=0) < t['folded_angle_max'],
+                  'DO NOT FOLD YOUR ARMS', None),
+    ),
+)
+
+# Exercise definitions keyed by exercise type, as used by the API
+EXERCISES = {
+    exercise.name: exercise
+    for exercise in (BICEP_CURLS, SHOULDER_PRESS, CRUNCHES, LATERAL_RAISES, SQUATS, TRICEP_PUSHDOWNS)
+}
+
+
+class ExerciseCounter:
+    """Runs the stage machine and form checks of one Exercise frame by frame."""
+
+    def __init__(self, exercise, thresholds=None):
+        """
+        Args:
+            exercise: Exercise definition
+            thresholds: Optional overrides for the exercise's config thresholds
+        """
+        self.exercise = exercise
+        self.thresholds = {**exercise.thresholds, **(thresholds or {})}
+        self.reset()
+
+    @property
+    def name(self):
+        return self.exercise.name
+
+    def reset(self):
+        """Reset reps, stage and form flags."""
+        self.reps = 0
+        self.stage = None
+        self.angles = None
+        self.form_errors = {check.name: False for check in self.exercise.form_checks}
+
+    def update(self, points, angles=None):
+        """
+        Advance the counter by one frame.
+
+        Args:
+            points: Landmark array of shape (33, D), or None if no pose
+            angles: Optional precomputed angles for the exercise's triples
+
+        Returns:
+            True if a rep was completed on this frame
+        """
+        if points is None:
+            return False
+        t = self.thresholds
+        if angles is None:
+            angles = utils.calculate_angles(points, self.exercise.triples)
+        self.angles = angles
+
+        previous = self.stage
+        for rule in self.exercise.rules:
+            if (rule.after is None or previous == rule.after) and rule.when(angles, t):
+                self.stage = rule.stage
+                break
+        for check in self.exercise.form_checks:
+            self.form_errors[check.name] = bool(check.when(angles, points, t))
+
+        if (previous, self.stage) == self.exercise.rep:
+            self.reps += 1
+            logger.info(f"{self.name} count: {self.reps}")
+            return True
+        return False
+
+
+class MultiCounter:
+    """
+    Fans one frame's landmarks out to several exercise counters.
+
+    The joint angles of all exercises are computed in one batched call per
+    frame. The detected exercise is the one with the most reps completed
+    within the last AUTO_DETECT['window'] pose frames; reps, stage and
+    form_errors report that counter, so a MultiCounter can be rendered like
+    a single ExerciseCounter.
+    """
+
+    def __init__(self, exercise_types=None, window=None):
+        """
+        Args:
+            exercise_types: Exercise types to track (default
+                config.AUTO_DETECT['exercises'])
+            window: Detection window in pose frames (default
+                config.AUTO_DETECT['window'])
+        """
+        exercise_types = exercise_types or config.AUTO_DETECT['exercises']
+        self.window = window or config.AUTO_DETECT['window']
+        self.counters = {name: create_counter(name) for name in exercise_types}
+
+        triples = np.concatenate([counter.exercise.triples for counter in self.counters.values()])
+        self._triples, inverse = np.unique(triples, axis=0, return_inverse=True)
+        bounds = np.cumsum([len(counter.exercise.triples) for counter in self.counters.values()])[:-1]
+        self._angle_index = dict(zip(self.counters, np.split(inverse.ravel(), bounds)))
+        self.reset()
+
+    def reset(self):
+        """Reset all counters and the detection history."""
+        for counter in self.counters.values():
+            counter.reset()
+        self.frames = 0
+        self._rep_frames = {name: collections.deque() for name in self.counters}
+        self.detected = None
+
+    def update(self, points):
+        """
+        Advance every counter by one frame.
+
+        Args:
+            points: Landmark array of shape (33, D), or None if no pose
+
+        Returns:
+            List of exercise types that completed a rep on this frame
+        """
+        if points is None:
+            return []
+        self.frames += 1
+        angles = utils.calculate_angles(points, self._triples)
+        completed = [
+            name for name, counter in self.counters.items()
+            if counter.update(points, angles[self._angle_index[name]])
+        ]
+
+        horizon = self.frames - self.window
+        recent = {}
+        for name, frames in self._rep_frames.items():
+            if name in completed:
+                frames.append(self.frames)
+            while frames and frames[0] <= horizon:
+                frames.popleft()
+            recent[name] = len(frames)
+        best = max(recent, key=recent.get)
+        if recent[best] and recent[best] > recent.get(self.detected, 0):
+            if best != self.detected:
+                logger.info(f"Detected exercise: {best}")
+            self.detected = best
+        return completed
+
+    @property
+    def current(self):
+        """The detected exercise's counter, or None."""
+        return self.counters.get(self.detected)
+
+    @property
+    def name(self):
+        return self.detected
+
+    @property
+    def reps(self):
+        return self.current.reps if self.current else 0
+
+    @property
+    def stage(self):
+        return self.current.stage if self.current else None
+
+    @property
+    def form_errors(self):
+        return self.current.form_errors if self.current else {}
+
+    @property
+    def angles(self):
+        return self.current.angles if self.current else None
+
+
+def create_counter(exercise_type, thresholds=None):
+    """
+    Create a counter for an exercise type.
+
+    Args:
+        exercise_type: One of the EXERCISES keys, e.g. 'bicep_curls'
+        thresholds: Optional threshold overrides
+
+    Returns:
+        ExerciseCounter instance
+    """
+    try:
+        exercise = EXERCISES[exercise_type]
+    except KeyError:
+        raise ValueError(f"Unknown exercise type: {exercise_type}") from None
+    return ExerciseCounter(exercise, thresholds)
@@ -0,0 +1,418 @@
+"""
+Exercise detection engine.
+Runs any exercise declared in counters.EXERCISES through one capture ->
+inference -> render loop with on-screen feedback and audio alerts.
+"""
+import collections
+import functools
+import logging
+import threading
+import time
+import cv2
+import numpy as np
+import audio
+import config
+import counters
+import pipeline
+import pose_pool
+import roi
+import scheduler
+import sources
+
+logger = logging.getLogger(__name__)
+
+NOT_IN_FRAME_MESSAGE = 'NOT IN FRAME'
+NOT_IN_FRAME_SOUND = 'joints_not_visible.mp3'
+
+# Audio queue priorities: form corrections before the not-in-frame reminder
+FORM_ERROR_PRIORITY = 1
+NOT_IN_FRAME_PRIORITY = 0
+
+MULTI_WINDOW_TITLE = 'Exercise Detection'
+
+# Initial size of the resizable detection window
+WINDOW_SIZE = (1800, 1200)
+
+# Smoothing factor of the FPS estimate published in snapshots
+FPS_SMOOTHING = 0.1
+
+# Immutable per-frame state of a detection run, published for API readers.
+# exercise is None while a MultiCounter has not detected one yet; angles and
+# form_errors are those of the (detected) exercise; latency_ms is the time
+# from capturing (or receiving) the frame until it was counted; timestamp is
+# time.time().
+Snapshot = collections.namedtuple(
+    'Snapshot', ['exercise', 'reps', 'stage', 'angles', 'form_errors', 'fps', 'frame', 'latency_ms',
+                 'timestamp'])
+
+
+class SnapshotSlot:
+    """
+    Single-writer slot holding the latest Snapshot.
+
+    The detection loop replaces the whole snapshot with one reference
+    assignment, which is atomic in CPython, so readers on other threads get
+    a consistent snapshot in O(1) without any lock on the hot loop.
+    """
+
+    def __init__(self):
+        self.latest = None
+
+    def publish(self, snapshot):
+        self.latest = snapshot
+
+
+def take_snapshot(counter, fps, frame, latency=0.0):
+    """
+    Build a Snapshot of a counter's current state.
+
+    Args:
+        counter: ExerciseCounter or MultiCounter
+        fps: Current processing rate
+        frame: Number of frames processed so far
+        latency: Seconds from capturing the frame until it was counted
+
+    Returns:
+        Snapshot
+    """
+    angles = counter.angles
+    return Snapshot(
+        exercise=counter.name,
+        reps=counter.reps,
+        stage=counter.stage,
+        angles=tuple(round(float(angle), 1) for angle in angles) if angles is not None else (),
+        form_errors=dict(counter.form_errors),
+        fps=round(fps, 1),
+        frame=frame,
+        latency_ms=round(latency * 1000.0, 1),
+        timestamp=time.time(),
+    )
+
+
+class Alert:
+    """On-screen message held for ERROR_DISPLAY_TIME, with an optional audio cue."""
+
+    def __init__(self, message, sound=None, priority=0, player=None):
+        """
+        Args:
+            message: Text shown while the alert is visible
+            sound: Optional audio file name queued when the alert triggers
+            priority: Priority of the cue in the audio queue
+            player: audio.AudioPlayer that plays the cue; the cue's cooldown
+                is kept per alert
+        """
+        self.message = message
+        self.sound = sound
+        self.priority = priority
+        self.player = player
+        self.visible_until = 0.0
+
+    def trigger(self, now):
+        """Show the alert and queue its sound unless it played recently."""
+        self.visible_until = now + config.ERROR_DISPLAY_TIME
+        if self.sound is not None and self.player is not None:
+            self.player.play(self.sound, self.priority, key=self)
+
+    def visible(self, now):
+        return now < self.visible_until
+
+
+def draw_status(image, counter):
+    """Draw the reps and stage status box."""
+    cv2.rectangle(image, (0, 0), (320, 83), (245, 117, 16), -1)
+
+    cv2.putText(image, 'REPS', (15, 12),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1, cv2.LINE_AA)
+    cv2.putText(image, str(counter.reps), (18, 70),
+                cv2.FONT_HERSHEY_SIMPLEX, 1.5, (255, 255, 255), 2, cv2.LINE_AA)
+
+    cv2.putText(image, 'STAGE', (165, 12),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1, cv2.LINE_AA)
+    if counter.stage:
+        cv2.putText(image, counter.stage, (120, 70),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.2, (255, 255, 255), 2, cv2.LINE_AA)
+
+
+def draw_exercise_name(image, name):
+    """Draw the detected exercise below the status box."""
+    label = name.replace('_', ' ').upper() if name else 'DETECTING...'
+    cv2.rectangle(image, (0, 83), (320, 113), (245, 117, 16), -1)
+    cv2.putText(image, label, (15, 104),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1, cv2.LINE_AA)
+
+
+def draw_alert(image, message):
+    """Draw an error banner along the bottom of the frame."""
+    height, width = image.shape[:2]
+    cv2.rectangle(image, (0, height - 60), (width, height), (0, 0, 255), -1)
+    cv2.putText(image, message, (width * 3 // 8, height - 30),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 2, cv2.LINE_AA)
+
+
+def fit_to_window(image, window):
+    """
+    Letterbox a frame to the current size of a resizable window.
+
+    Returns:
+        Image of the window's size with the frame centered, aspect preserved
+    """
+    _, _, window_width, window_height = cv2.getWindowImageRect(window)
+    if window_width <= 0 or window_height <= 0:
+        return image
+
+    frame_height, frame_width = image.shape[:2]
+    scale = min(window_width / frame_width, window_height / frame_height)
+    new_width, new_height = int(frame_width * scale), int(frame_height * scale)
+
+    canvas = np.zeros((window_height, window_width, 3), dtype=np.uint8)
+    x_offset = (window_width - new_width) // 2
+    y_offset = (window_height - new_height) // 2
+    canvas[y_offset:y_offset + new_height, x_offset:x_offset + new_width] = cv2.resize(image, (new_width, new_height))
+    return canvas
+
+
+def solutions():
+    """
+    Import MediaPipe on first use; importing it takes about a second, which
+    servers should not pay until detection starts.
+
+    Returns:
+        The mediapipe.solutions module
+    """
+    import mediapipe as mp
+    return mp.solutions
+
+
+@functools.lru_cache(maxsize=None)
+def _pose_drawing():
+    drawing = solutions().drawing_utils
+    return (drawing.draw_landmarks, solutions().pose.POSE_CONNECTIONS,
+            drawing.DrawingSpec(color=(245, 117, 66), thickness=2, circle_radius=2),
+            drawing.DrawingSpec(color=(245, 66, 230), thickness=2, circle_radius=2))
+
+
+def draw_pose(image, pose_landmarks):
+    """Draw the pose skeleton."""
+    draw_landmarks, connections, landmark_spec, connection_spec = _pose_drawing()
+    draw_landmarks(image, pose_landmarks, connections, landmark_spec, connection_spec)
+
+
+def audio_cues():
+    """
+    Returns:
+        Set of all audio file names the engine can play
+    """
+    return {check.sound for exercise in counters.EXERCISES.values()
+            for check in exercise.form_checks if check.sound} | {NOT_IN_FRAME_SOUND}
+
+
+def warm_up():
+    """
+    Load everything a first detection run would otherwise load: MediaPipe,
+    a pooled Pose graph (by running it on a blank frame) and the audio clips.
+    """
+    with pose_pool.get_pool().checkout() as pose:
+        pose.process(np.zeros((256, 256, 3), dtype=np.uint8))
+    audio.get_player().load(audio_cues())
+
+
+class WarmUp:
+    """Runs warm_up() once on a background thread and reports its state."""
+
+    def __init__(self):
+        self.state = 'idle'
+        self.error = None
+        self.seconds = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        Start warming up unless it is running or done.
+
+        Returns:
+            True if a warm-up was started
+        """
+        with self._lock:
+            if self.state in ('warming', 'ready'):
+                return False
+            self.state = 'warming'
+        threading.Thread(target=self._run, name='warm-up', daemon=True).start()
+        return True
+
+    def _run(self):
+        start = time.perf_counter()
+        try:
+            warm_up()
+        except Exception as e:
+            logger.error(f"Warm-up failed: {e}", exc_info=True)
+            self.seconds = round(time.perf_counter() - start, 3)
+            self.error = str(e)
+            self.state = 'failed'
+        else:
+            self.seconds = round(time.perf_counter() - start, 3)
+            self.state = 'ready'
+            logger.info(f"Warmed up in {self.seconds:.2f}s")
+
+    def status(self):
+        """
+        Returns:
+            Dict with state ('idle', 'warming', 'ready' or 'failed'), error
+            and seconds taken
+        """
+        return {'state': self.state, 'error': self.error, 'seconds': self.seconds}
+
+
+def make_counter(exercise_type):
+    """
+    Create the counter for a detection run.
+
+    Args:
+        exercise_type: One of the counters.EXERCISES keys, or a list of them
+            to run side by side on one pose inference
+
+    Returns:
+        ExerciseCounter, or MultiCounter for a list
+    """
+    if isinstance(exercise_type, str):
+        return counters.create_counter(exercise_type)
+    return counters.MultiCounter(exercise_type)
+
+
+def run_detection(exercise_type, source=None, display=None, counter=None, stop_event=None, snapshots=None,
+                  video=None, recorder=None, timings=None):
+    """
+    Run live detection until 'q' is pressed, the source ends or stop_event
+    is set.
+
+    Args:
+        exercise_type: One of the counters.EXERCISES keys, e.g. 'bicep_curls',
+            or a list of them to run side by side on one pose inference and
+            show the detected exercise
+        source: Anything accepted by sources.open_source (default: the
+            configured camera)
+        display: Show the annotated frames in a window (default
+            config.DISPLAY_WINDOW)
+        counter: Optional counter from make_counter, for callers that read
+            it while detection runs
+        stop_event: Optional threading.Event checked every frame; once set,
+            the loop exits and the source, Pose and window are released
+            and pending audio cues dropped before returning
+        snapshots: Optional SnapshotSlot that receives a Snapshot every frame
+        video: Optional streaming.FrameBroadcaster that receives the
+            annotated frames while it has viewers; frames are only rendered
+            while the window is shown or someone is watching
+        recorder: Optional recording.RecordingWriter that receives every
+            frame's landmarks and counter state
+        timings: Optional pipeline.StageTimer receiving the pipeline stages
+            plus 'count', 'record', 'draw', 'encode' and 'display'
+
+    Returns:
+        The ExerciseCounter (or MultiCounter), holding the final reps and stage
+
+    Raises:
+        OSError: If the source cannot be opened; errors while detecting are
+            raised too, after the source, Pose and window are released
+    """
+    display = config.DISPLAY_WINDOW if display is None else display
+    counter = counter or make_counter(exercise_type)
+    if isinstance(counter, counters.MultiCounter):
+        members = list(counter.counters.values())
+        window = MULTI_WINDOW_TITLE
+    else:
+        members = [counter]
+        window = counter.exercise.title
+    checks = [check for member in members for check in member.exercise.form_checks]
+
+    player = audio.get_player()
+    sounds = player.load({check.sound for check in checks if check.sound} | {NOT_IN_FRAME_SOUND})
+    alerts = {
+        check.name: Alert(check.message, check.sound if check.sound in sounds else None, FORM_ERROR_PRIORITY, player)
+        for check in checks
+    }
+    not_in_frame = Alert(NOT_IN_FRAME_MESSAGE, NOT_IN_FRAME_SOUND if NOT_IN_FRAME_SOUND in sounds else None,
+                         NOT_IN_FRAME_PRIORITY, player)
+
+    cap = sources.open_source(config.CAMERA_INDEX if source is None else source)
+    frames = None
+    try:
+        if not cap.isOpened():
+            raise OSError(f"Could not open source {source if source is not None else config.CAMERA_INDEX}")
+
+        if display:
+            cv2.namedWindow(window, cv2.WINDOW_NORMAL)
+            cv2.resizeWindow(window, *WINDOW_SIZE)
+
+        with pose_pool.get_pool().checkout() as pose:
+            tracker = roi.RoiTracker(pose.process) if config.ROI_TRACKING else None
+            inference = scheduler.InferenceScheduler(tracker.process if tracker else pose.process)
+            frames = pipeline.FramePipeline(cap, inference.process, stop_event=stop_event, timings=timings,
+                                            inference_width=config.INFERENCE_WIDTH, roi=tracker, due=inference.due)
+            timings = frames.timings
+            fps = 0.0
+            frame = 0
+            last = time.perf_counter()
+            for image, results in frames:
+                if stop_event is not None and stop_event.is_set():
+                    break
+                now = time.time()
+                tick = time.perf_counter()
+                if tick > last:
+                    rate = 1.0 / (tick - last)
+                    fps = fps + FPS_SMOOTHING * (rate - fps) if frame else rate
+                last = tick
+                frame += 1
+
+                if results.landmarks is not None:
+                    counter.update(results.landmarks)
+                    for name, active in counter.form_errors.items():
+                        if active:
+                            alerts[name].trigger(now)
+                else:
+                    not_in_frame.trigger(now)
+                timings.record('count', time.perf_counter() - tick)
+
+                if recorder is not None:
+                    start = time.perf_counter()
+                    recorder.write(results.landmarks, counter)
+                    timings.record('record', time.perf_counter() - start)
+
+                if snapshots is not None:
+                    snapshots.publish(take_snapshot(counter, fps, frame, time.perf_counter() - frames.frame_time))
+
+                if not display and (video is None or not video.wanted):
+                    continue
+
+                start = time.perf_counter()
+                draw_status(image, counter)
+                if len(members) > 1:
+                    draw_exercise_name(image, counter.name)
+                for alert in (*alerts.values(), not_in_frame):
+                    if alert.visible(now):
+                        draw_alert(image, alert.message)
+
+                if results.pose_landmarks:
+                    draw_pose(image, results.pose_landmarks)
+                timings.record('draw', time.perf_counter() - start)
+
+                if video is not None and video.wanted:
+                    start = time.perf_counter()
+                    video.publish(image)
+                    timings.record('encode', time.perf_counter() - start)
+
+                if display:
+                    start = time.perf_counter()
+                    cv2.imshow(window, fit_to_window(image, window))
+                    key = cv2.waitKey(1)
+                    timings.record('display', time.perf_counter() - start)
+                    if key & 0xFF == ord('q'):
+                        break
+
+    finally:
+        if frames is not None:
+            frames.stop()
+        cap.release()
+        if display:
+            cv2.destroyWindow(window)
+        player.cancel([*alerts.values(), not_in_frame])
+        logger.info(f"{window} stopped with {counter.reps} reps")
+    return counter
@@ -0,0 +1,189 @@
+"""
+Exercise event streaming.
+Turns the per-frame snapshots of a detection run into rep, stage-change and
+form-error events (plus optional decimated angle telemetry) and fans them
+out to subscribers, e.g. Server-Sent Events clients of app.py.
+"""
+import json
+import logging
+import threading
+import config
+import engine
+import pipeline
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    One consumer's event queue.
+
+    The queue is bounded and drops the oldest events when the consumer
+    falls behind, so a slow client never blocks the detection loop.
+    """
+
+    def __init__(self, telemetry_hz=0.0, queue_size=None):
+        """
+        Args:
+            telemetry_hz: Rate of 'telemetry' events with angles and FPS; 0 for none
+            queue_size: Maximum queued events (default config.EVENT_QUEUE_SIZE)
+        """
+        self.telemetry_interval = 1.0 / telemetry_hz if telemetry_hz > 0 else None
+        self.last_telemetry = 0.0
+        self.queue = pipeline.DropOldestQueue(queue_size or config.EVENT_QUEUE_SIZE)
+        self.reported_drops = 0
+
+    def get(self, timeout=None):
+        """
+        Returns:
+            The next (event, data) pair, or None on timeout or once closed
+        """
+        return self.queue.get(timeout)
+
+    def overflow(self):
+        """
+        Returns:
+            Number of events dropped since the last call
+        """
+        dropped = self.queue.dropped - self.reported_drops
+        self.reported_drops = self.queue.dropped
+        return dropped
+
+    def close(self):
+        self.queue.close()
+
+
+class EventSlot(engine.SnapshotSlot):
+    """
+    SnapshotSlot that also publishes the changes between consecutive
+    snapshots as events to its subscribers.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, telemetry_hz=0.0):
+        """
+        Register a new subscriber.
+
+        Args:
+            telemetry_hz: Rate of 'telemetry' events; 0 for none
+
+        Returns:
+            Subscription, to be passed to unsubscribe when done
+        """
+        subscription = Subscription(telemetry_hz)
+        with self._lock:
+            self._subscribers = self._subscribers + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers = [s for s in self._subscribers if s is not subscription]
+        subscription.close()
+
+    def close(self):
+        """Close all subscriptions, e.g. when the run ends."""
+        with self._lock:
+            subscribers, self._subscribers = self._subscribers, []
+        for subscription in subscribers:
+            subscription.close()
+
+    def publish(self, snapshot):
+        previous = self.latest
+        super().publish(snapshot)
+        subscribers = self._subscribers
+        if not subscribers:
+            return
+
+        events = diff_snapshots(previous, snapshot)
+        for subscription in subscribers:
+            for event in events:
+                subscription.queue.put(event)
+            interval = subscription.telemetry_interval
+            if interval is not None and snapshot.timestamp - subscription.last_telemetry >= interval:
+                subscription.last_telemetry = snapshot.timestamp
+                subscription.queue.put(('telemetry', {
+                    'angles': snapshot.angles,
+                    'fps': snapshot.fps,
+                    'frame': snapshot.frame,
+                    'latency_ms': snapshot.latency_ms,
+                    'timestamp': snapshot.timestamp,
+                }))
+
+
+def diff_snapshots(previous, snapshot):
+    """
+    Get the events between two consecutive snapshots.
+
+    Args:
+        previous: Previous Snapshot, or None
+        snapshot: Current Snapshot
+
+    Returns:
+        List of (event, data) pairs: 'exercise', 'stage', 'rep' and 'form_error'
+    """
+    base = {'frame': snapshot.frame, 'timestamp': snapshot.timestamp}
+    if previous is None:
+        previous = engine.Snapshot(None, 0, None, (), {}, 0.0, 0, 0.0, 0.0)
+
+    events = []
+    if snapshot.exercise != previous.exercise:
+        events.append(('exercise', {**base, 'exercise': snapshot.exercise}))
+    if snapshot.stage != previous.stage:
+        events.append(('stage', {**base, 'exercise': snapshot.exercise,
+                                 'stage': snapshot.stage, 'previous': previous.stage}))
+    if snapshot.reps != previous.reps:
+        events.append(('rep', {**base, 'exercise': snapshot.exercise, 'reps': snapshot.reps}))
+    for name, active in snapshot.form_errors.items():
+        if active and not previous.form_errors.get(name):
+            events.append(('form_error', {**base, 'exercise': snapshot.exercise, 'error': name}))
+    return events
+
+
+def format_sse(event, data):
+    """Encode one event in Server-Sent Events wire format."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream(slot, is_running, telemetry_hz=0.0, keepalive=None):
+    """
+    Generate a Server-Sent Events stream for a detection run.
+
+    Starts with the current snapshot, then yields events as they happen,
+    an 'overflow' event whenever this client fell behind and events were
+    dropped, and comment lines as keepalives. Ends with an 'end' event
+    once the run stops.
+
+    Args:
+        slot: EventSlot of the run
+        is_running: Callable returning whether the run is still active
+        telemetry_hz: Rate of 'telemetry' events; 0 for none
+        keepalive: Seconds between keepalives (default config.EVENT_KEEPALIVE)
+
+    Yields:
+        SSE-encoded strings
+    """
+    keepalive = keepalive or config.EVENT_KEEPALIVE
+    subscription = slot.subscribe(telemetry_hz)
+    try:
+        snapshot = slot.latest
+        if snapshot is not None:
+            yield format_sse('snapshot', snapshot._asdict())
+        while True:
+            item = subscription.get(keepalive)
+            dropped = subscription.overflow()
+            if dropped:
+                yield format_sse('overflow', {'dropped': dropped})
+            if item is not None:
+                yield format_sse(*item)
+            elif not is_running() or subscription.queue.closed:
+                snapshot = slot.latest
+                yield format_sse('end', snapshot._asdict() if snapshot else {})
+                return
+            else:
+                yield ": keepalive\n\n"
+    finally:
+        slot.unsubscribe(subscription)
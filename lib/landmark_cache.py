@@ -0,0 +1,191 @@
+"""
+Persistent landmark cache for recorded sessions.
+Stores the per-frame pose landmarks of a video as a memory-mappable .npy
+file, keyed by the video's content hash and the pose model settings, so
+re-scoring with new thresholds only reruns the counting logic.
+"""
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+import numpy as np
+import config
+import landmarks
+import pipeline
+import roi
+import sources
+
+logger = logging.getLogger(__name__)
+
+# Bump when the track layout or extraction changes to invalidate old entries
+CACHE_VERSION = 1
+
+_HASH_CHUNK = 1 << 20
+
+
+def model_settings():
+    """
+    Get the pose model settings that affect extracted landmarks.
+
+    Returns:
+        Dict of settings included in the cache key
+    """
+    return {
+        'min_detection_confidence': config.MIN_DETECTION_CONFIDENCE,
+        'min_tracking_confidence': config.MIN_TRACKING_CONFIDENCE,
+        'model_complexity': config.MODEL_COMPLEXITY,
+        'smooth_landmarks': config.SMOOTH_LANDMARKS,
+        'inference_width': config.INFERENCE_WIDTH,
+        'roi_tracking': config.ROI_TRACKING,
+        'version': CACHE_VERSION,
+    }
+
+
+def content_hash(path):
+    """
+    Hash a video file's contents, or every frame image in a directory.
+
+    Args:
+        path: Video file or image directory
+
+    Returns:
+        Hex digest string
+    """
+    path = Path(path)
+    files = sorted(p for p in path.iterdir() if p.is_file()) if path.is_dir() else [path]
+    digest = hashlib.blake2b(digest_size=16)
+    for file in files:
+        if path.is_dir():
+            digest.update(file.name.encode())
+        with open(file, 'rb') as f:
+            for chunk in iter(lambda: f.read(_HASH_CHUNK), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(path, settings=None):
+    """
+    Build the cache key for a video and model settings.
+
+    Args:
+        path: Video file or image directory
+        settings: Model settings dict (default model_settings())
+
+    Returns:
+        Key string used as the cache file name
+    """
+    settings = model_settings() if settings is None else settings
+    settings_hash = hashlib.blake2b(json.dumps(settings, sort_keys=True).encode(), digest_size=8).hexdigest()
+    return f"{content_hash(path)}-{settings_hash}"
+
+
+def extract_track(target, pose):
+    """
+    Run pose inference on every frame of a source.
+
+    Args:
+        target: Anything accepted by sources.open_source
+        pose: MediaPipe Pose instance
+
+    Returns:
+        Tuple of (track array of shape (T, 33, 4) float32 with NaN rows for
+        frames without a pose, source fps)
+    """
+    source = sources.open_source(target)
+    buffer = landmarks.LandmarkBuffer()
+    empty = np.full((landmarks.NUM_LANDMARKS, 4), np.nan, dtype=np.float32)
+    rows = []
+    tracker = roi.RoiTracker(pose.process) if config.ROI_TRACKING else None
+    try:
+        for _, results in pipeline.FramePipeline(source, tracker.process if tracker else pose.process, flip=False,
+                                                 inference_width=config.INFERENCE_WIDTH, roi=tracker):
+            points = buffer.update(results.pose_landmarks)
+            rows.append(empty if points is None else points.copy())
+    finally:
+        source.release()
+    track = np.stack(rows) if rows else np.empty((0, landmarks.NUM_LANDMARKS, 4), dtype=np.float32)
+    return track, source.fps
+
+
+class LandmarkCache:
+    """On-disk cache of landmark tracks, one .npy plus .json metadata per entry."""
+
+    def __init__(self, directory=None, settings=None):
+        """
+        Args:
+            directory: Cache directory (default config.LANDMARK_CACHE_DIR)
+            settings: Model settings dict (default model_settings())
+        """
+        self.directory = Path(directory or config.LANDMARK_CACHE_DIR)
+        self.settings = model_settings() if settings is None else settings
+
+    def _paths(self, key):
+        return self.directory / f"{key}.npy", self.directory / f"{key}.json"
+
+    def get(self, key):
+        """
+        Look up a cached track.
+
+        Returns:
+            Tuple of (memory-mapped track, metadata dict), or None on a miss
+        """
+        track_path, meta_path = self._paths(key)
+        if not (track_path.exists() and meta_path.exists()):
+            return None
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            return np.load(track_path, mmap_mode='r'), meta
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache entry {key}: {e}")
+            return None
+
+    def put(self, key, track, meta):
+        """Store a track atomically under key."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        track_path, meta_path = self._paths(key)
+        tmp_track = track_path.with_name(f"{track_path.stem}.{os.getpid()}.tmp.npy")
+        tmp_meta = meta_path.with_name(f"{meta_path.name}.{os.getpid()}.tmp")
+        np.save(tmp_track, np.ascontiguousarray(track, dtype=np.float32))
+        with open(tmp_meta, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_track, track_path)
+        os.replace(tmp_meta, meta_path)
+
+    def load_track(self, path, pose_factory=None, refresh=False, pose=None):
+        """
+        Get a video's landmark track, extracting and caching it on a miss.
+
+        Args:
+            path: Video file or image directory
+            pose_factory: Callable returning a MediaPipe Pose; only called on
+                a miss without a pose, and the Pose is closed after extraction
+            refresh: Re-extract even if a cached entry exists
+            pose: Optional MediaPipe Pose owned by the caller, used on a miss
+                instead of pose_factory; it is reset before and left open
+
+        Returns:
+            Tuple of (track array of shape (T, 33, 4), fps)
+        """
+        key = cache_key(path, self.settings)
+        if not refresh:
+            entry = self.get(key)
+            if entry is not None:
+                track, meta = entry
+                return track, meta['fps']
+
+        owns_pose = pose is None
+        if owns_pose:
+            pose = pose_factory()
+        else:
+            pose.reset()
+        try:
+            track, fps = extract_track(path, pose)
+        finally:
+            if owns_pose:
+                pose.close()
+        self.put(key, track, {'source': str(path), 'fps': fps, 'frames': len(track), 'settings': self.settings})
+        logger.info(f"Cached {len(track)} frames of landmarks for {path}")
+        return track, fps
+
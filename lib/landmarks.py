@@ -0,0 +1,96 @@
+"""
+Shared landmark extraction for exercise detection modules.
+Copies MediaPipe pose landmarks into a reusable NumPy buffer once per frame.
+"""
+import numpy as np
+import utils
+
+# MediaPipe Pose landmark names, in landmark index order
+LANDMARK_NAMES = (
+    'NOSE', 'LEFT_EYE_INNER', 'LEFT_EYE', 'LEFT_EYE_OUTER',
+    'RIGHT_EYE_INNER', 'RIGHT_EYE', 'RIGHT_EYE_OUTER',
+    'LEFT_EAR', 'RIGHT_EAR', 'MOUTH_LEFT', 'MOUTH_RIGHT',
+    'LEFT_SHOULDER', 'RIGHT_SHOULDER', 'LEFT_ELBOW', 'RIGHT_ELBOW',
+    'LEFT_WRIST', 'RIGHT_WRIST', 'LEFT_PINKY', 'RIGHT_PINKY',
+    'LEFT_INDEX', 'RIGHT_INDEX', 'LEFT_THUMB', 'RIGHT_THUMB',
+    'LEFT_HIP', 'RIGHT_HIP', 'LEFT_KNEE', 'RIGHT_KNEE',
+    'LEFT_ANKLE', 'RIGHT_ANKLE', 'LEFT_HEEL', 'RIGHT_HEEL',
+    'LEFT_FOOT_INDEX', 'RIGHT_FOOT_INDEX',
+)
+
+NUM_LANDMARKS = len(LANDMARK_NAMES)
+
+# Precomputed joint-index map, e.g. JOINTS['LEFT_ELBOW'] == 13
+JOINTS = {name: index for index, name in enumerate(LANDMARK_NAMES)}
+
+# Column layout of a landmark array
+X, Y, Z, VISIBILITY = range(4)
+
+# Wire formats of packed landmark frames: little-endian (33, 4) arrays
+PACKED_DTYPES = {'float16': np.dtype('<f2'), 'float32': np.dtype('<f4')}
+
+
+def joint_triples(triples):
+    """
+    Build a calculate_angles joint-index table from landmark names.
+
+    Args:
+        triples: Sequence of (a, b, c) landmark names, b being the vertex
+
+    Returns:
+        Integer array of shape (K, 3)
+    """
+    return utils.build_triples([(JOINTS[a], JOINTS[b], JOINTS[c]) for a, b, c in triples])
+
+
+class LandmarkBuffer:
+    """
+    Reusable (33, 4) float32 array of x, y, z, visibility per landmark.
+
+    The same array is overwritten on every update, so callers that need
+    to keep a frame's landmarks must copy them.
+    """
+
+    def __init__(self):
+        self.array = np.zeros((NUM_LANDMARKS, 4), dtype=np.float32)
+
+    def update(self, pose_landmarks):
+        """
+        Copy a frame's landmarks into the buffer.
+
+        Args:
+            pose_landmarks: results.pose_landmarks from MediaPipe (may be None)
+
+        Returns:
+            The buffer array, or None if no pose was detected
+        """
+        if not pose_landmarks:
+            return None
+        self.array[:] = [(lm.x, lm.y, lm.z, lm.visibility) for lm in pose_landmarks.landmark]
+        return self.array
+
+
+def unpack_frames(data, dtype='float32'):
+    """
+    Decode binary-packed landmark frames, e.g. from on-device pose estimation.
+
+    Each frame is 33 x 4 (x, y, z, visibility) little-endian values; a
+    frame with NaN values means no pose was detected.
+
+    Args:
+        data: Bytes holding one or more frames back to back
+        dtype: 'float16' or 'float32'
+
+    Returns:
+        float32 array of shape (N, 33, 4)
+
+    Raises:
+        ValueError: If the dtype is unknown or data is not whole frames
+    """
+    if dtype not in PACKED_DTYPES:
+        raise ValueError(f"Unknown landmark dtype: {dtype}, expected one of {sorted(PACKED_DTYPES)}")
+    frame_size = NUM_LANDMARKS * 4 * PACKED_DTYPES[dtype].itemsize
+    if not len(data) or len(data) % frame_size:
+        raise ValueError(f"Expected a multiple of {frame_size} bytes of {dtype} landmarks, got {len(data)}")
+    frames = np.frombuffer(data, PACKED_DTYPES[dtype]).reshape(-1, NUM_LANDMARKS, 4)
+    return frames.astype(np.float32)
@@ -0,0 +1,86 @@
+"""
+Prometheus metrics.
+Renders the per-stage latency histograms, frame rates and dropped-frame
+counts of all running sessions in the Prometheus text exposition format,
+for capacity planning of stations per server.
+"""
+import pipeline
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+PREFIX = 'exercise'
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render(session_manager):
+    """
+    Render the metrics of a SessionManager's running sessions.
+
+    Stage latencies are summaries: quantiles over the rolling window of
+    config.METRICS_WINDOW, with lifetime _sum and _count.
+
+    Args:
+        session_manager: sessions.SessionManager
+
+    Returns:
+        Metrics text
+    """
+    running = [session for session in session_manager.list() if session.state == 'running']
+    lines = [
+        f"# HELP {PREFIX}_sessions Running detection sessions by kind.",
+        f"# TYPE {PREFIX}_sessions gauge",
+        f"{PREFIX}_sessions{_labels(kind='camera')} {session_manager.active_count()}",
+        f"{PREFIX}_sessions{_labels(kind='landmarks')} {session_manager.landmark_count()}",
+        f"# HELP {PREFIX}_max_sessions Concurrent camera session limit.",
+        f"# TYPE {PREFIX}_max_sessions gauge",
+        f"{PREFIX}_max_sessions {session_manager.max_sessions}",
+    ]
+
+    stage_lines, fps_lines, frame_lines, drop_lines = [], [], [], []
+    for session in running:
+        session_label = {'session': session.id}
+        for stage, stats in session.timings.summary().items():
+            labels = {**session_label, 'stage': stage}
+            for q in pipeline.StageTimer.QUANTILES:
+                value = stats[f"p{round(q * 100)}_ms"]
+                if value is not None:
+                    stage_lines.append(
+                        f"{PREFIX}_stage_seconds{_labels(**labels, quantile=q)} {value / 1000.0:.6g}")
+            stage_lines.append(f"{PREFIX}_stage_seconds_sum{_labels(**labels)} {stats['sum_s']:.6g}")
+            stage_lines.append(f"{PREFIX}_stage_seconds_count{_labels(**labels)} {stats['count']}")
+
+        snapshot = session.snapshots.latest
+        if snapshot is not None:
+            fps_lines.append(f"{PREFIX}_fps{_labels(**session_label)} {snapshot.fps}")
+            frame_lines.append(f"{PREFIX}_frames_total{_labels(**session_label)} {snapshot.frame}")
+
+        drops = session.timings.counts()
+        if session.push_source is not None:
+            drops['dropped_ingest'] = session.push_source.dropped
+        for name, count in sorted(drops.items()):
+            if name.startswith('dropped_'):
+                queue = name[len('dropped_'):]
+                drop_lines.append(f"{PREFIX}_dropped_frames_total{_labels(**session_label, queue=queue)} {count}")
+
+    lines += [
+        f"# HELP {PREFIX}_stage_seconds Processing time per frame and pipeline stage.",
+        f"# TYPE {PREFIX}_stage_seconds summary",
+        *stage_lines,
+        f"# HELP {PREFIX}_fps Smoothed frames processed per second.",
+        f"# TYPE {PREFIX}_fps gauge",
+        *fps_lines,
+        f"# HELP {PREFIX}_frames_total Frames processed.",
+        f"# TYPE {PREFIX}_frames_total counter",
+        *frame_lines,
+        f"# HELP {PREFIX}_dropped_frames_total Stale frames dropped, by queue.",
+        f"# TYPE {PREFIX}_dropped_frames_total counter",
+        *drop_lines,
+    ]
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,419 @@
+"""
+Pipelined frame processing for exercise detection modules.
+Runs camera capture and pose inference on their own threads, connected to
+the render stage by bounded drop-oldest queues.
+"""
+import bisect
+import collections
+import logging
+import threading
+import time
+import cv2
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class DropOldestQueue:
+    """
+    Bounded FIFO queue that discards its oldest item instead of blocking
+    the producer when full.
+
+    With drop=False it behaves as a plain blocking queue, for recorded
+    sources where every frame must be processed.
+    """
+
+    def __init__(self, maxsize=2, drop=True):
+        self._items = collections.deque()
+        self._maxsize = maxsize
+        self._drop = drop
+        self._cond = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        """
+        Add an item, dropping the oldest one (or waiting) if the queue is full.
+
+        Returns:
+            True if an item was dropped to make room
+        """
+        dropped = False
+        with self._cond:
+            if not self._drop:
+                self._cond.wait_for(lambda: len(self._items) < self._maxsize or self._closed)
+                if self._closed:
+                    return False
+            elif len(self._items) >= self._maxsize:
+                self._items.popleft()
+                self.dropped += 1
+                dropped = True
+            self._items.append(item)
+            self._cond.notify_all()
+        return dropped
+
+    def get(self, timeout=None):
+        """
+        Remove and return the oldest item.
+
+        Returns:
+            The item, or None once the queue is closed and drained or the
+            timeout expires
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self._closed, timeout):
+                return None
+            if self._items:
+                item = self._items.popleft()
+                self._cond.notify_all()
+                return item
+            return None
+
+    def close(self):
+        """Wake up all consumers; get() returns None once drained."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+
+class LatencyHistogram:
+    """
+    Rolling histogram of durations in log-spaced buckets.
+
+    Recording is a bisect and an increment. Quantiles cover the last one to
+    two half-windows: counts go to the current half-window, which replaces
+    the previous one when it is window / 2 old. Count, sum and max cover
+    the whole lifetime. Not thread-safe; StageTimer serializes access.
+    """
+
+    # Bucket upper bounds in seconds: 10 us to ~20 s, 12 per decade (~21% wide)
+    BOUNDS = tuple(1e-5 * 10 ** (i / 12) for i in range(76))
+
+    def __init__(self, window=None):
+        """
+        Args:
+            window: Seconds covered by quantiles (default config.METRICS_WINDOW)
+        """
+        self.window = window or config.METRICS_WINDOW
+        self.count = 0
+        self.total = 0.0
+        self.worst = 0.0
+        self._current = [0] * (len(self.BOUNDS) + 1)
+        self._previous = [0] * (len(self.BOUNDS) + 1)
+        self._rotated = time.monotonic()
+
+    def record(self, seconds):
+        now = time.monotonic()
+        if now - self._rotated >= self.window / 2:
+            self._rotate(now)
+        self._current[bisect.bisect_left(self.BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.worst:
+            self.worst = seconds
+
+    def _rotate(self, now):
+        # A whole idle window means the previous half-window is stale too
+        stale = now - self._rotated >= self.window
+        self._previous = [0] * len(self._current) if stale else self._current
+        self._current = [0] * len(self._previous)
+        self._rotated = now
+
+    def quantiles(self, qs):
+        """
+        Estimate quantiles over the rolling window.
+
+        Args:
+            qs: Quantiles in [0, 1], e.g. (0.5, 0.95, 0.99)
+
+        Returns:
+            List of durations in seconds (bucket upper bounds, capped at
+            the lifetime max), or None for each if the window is empty
+        """
+        if time.monotonic() - self._rotated >= self.window / 2:
+            self._rotate(time.monotonic())
+        counts = [a + b for a, b in zip(self._previous, self._current)]
+        total = sum(counts)
+        if not total:
+            return [None] * len(qs)
+        results = []
+        for q in qs:
+            rank = q * total
+            seen = 0
+            for index, count in enumerate(counts):
+                seen += count
+                if count and seen >= rank:
+                    break
+            bound = self.BOUNDS[index] if index < len(self.BOUNDS) else self.worst
+            results.append(min(bound, self.worst))
+        return results
+
+
+class StageTimer:
+    """Thread-safe per-stage latency histograms and event counters."""
+
+    # Quantiles reported by summary()
+    QUANTILES = (0.5, 0.95, 0.99)
+
+    def __init__(self, window=None):
+        """
+        Args:
+            window: Seconds covered by quantiles (default config.METRICS_WINDOW)
+        """
+        self.window = window
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._counts = collections.Counter()
+
+    def record(self, stage, seconds):
+        """Record one measurement for a stage."""
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = LatencyHistogram(self.window)
+            histogram.record(seconds)
+
+    def count(self, name, n=1):
+        """Add to an event counter, e.g. dropped frames."""
+        with self._lock:
+            self._counts[name] += n
+
+    def counts(self):
+        """
+        Returns:
+            Dict of event counter totals
+        """
+        with self._lock:
+            return dict(self._counts)
+
+    def summary(self):
+        """
+        Get per-stage statistics.
+
+        Returns:
+            Dict mapping stage name to count, sum_s, mean_ms and max_ms over
+            the lifetime, and p50_ms, p95_ms and p99_ms over the rolling
+            window (None if it is empty)
+        """
+        with self._lock:
+            summary = {}
+            for stage, histogram in self._stages.items():
+                stats = {
+                    'count': histogram.count,
+                    'sum_s': histogram.total,
+                    'mean_ms': histogram.total * 1000.0 / histogram.count,
+                    'max_ms': histogram.worst * 1000.0,
+                }
+                for q, value in zip(self.QUANTILES, histogram.quantiles(self.QUANTILES)):
+                    stats[f"p{round(q * 100)}_ms"] = value * 1000.0 if value is not None else None
+                summary[stage] = stats
+            return summary
+
+
+class FramePipeline:
+    """
+    Capture -> inference -> render pipeline.
+
+    Iterating the pipeline yields (image, results) pairs, where image is
+    the flipped BGR camera frame and results is the output of process()
+    for that frame. The caller's loop body is the render stage.
+
+    timings records the 'capture', 'flip', 'convert' (crop, downscale and BGR to RGB),
+    'inference', 'render' (the caller's loop body) and 'latency' (capture
+    to end of render) stages, and counts 'dropped_capture' and
+    'dropped_inference' frames; the render stage may add its own stages.
+
+    frame_time is the time.perf_counter() at which the frame being rendered
+    was captured (or received, for sources that set a timestamp), so the
+    render stage can measure end-to-end latency.
+    """
+
+    # Seconds between stop checks while the render stage waits for a frame
+    POLL_INTERVAL = 0.1
+
+    def __init__(self, cap, process, queue_size=2, flip=True, drop=None, stop_event=None, timings=None,
+                 inference_width=0, roi=None, due=None):
+        """
+        Args:
+            cap: Opened cv2.VideoCapture or sources.FrameSource
+            process: Inference callable taking an RGB image, e.g. pose.process
+            queue_size: Capacity of each inter-stage queue
+            flip: Mirror frames horizontally
+            drop: Drop stale frames when a stage falls behind; defaults to
+                True for live sources and False for recorded ones
+            stop_event: Optional threading.Event; setting it from any thread
+                ends iteration within one frame or POLL_INTERVAL
+            timings: Optional StageTimer to record into, e.g. one the caller
+                exports as metrics
+            inference_width: Frames wider than this are downscaled before
+                inference; 0 keeps the full size. Pose landmarks are
+                normalized, so they still apply to the full-size frame.
+            roi: Optional roi.RoiTracker that crops frames before they are
+                downscaled; process must then map its results back through
+                roi.process
+            due: Optional callable telling whether process() will run
+                inference on the next frame, e.g. InferenceScheduler.due;
+                when it returns False, the frame is neither cropped, resized
+                nor converted and process() gets None instead of an image
+        """
+        self.cap = cap
+        self.process = process
+        self.flip = flip
+        self.inference_width = inference_width
+        self.roi = roi
+        self.due = due
+        if drop is None:
+            drop = getattr(cap, 'realtime', True)
+        self.timings = timings or StageTimer()
+        self._frames = DropOldestQueue(queue_size, drop)
+        self._results = DropOldestQueue(queue_size, drop)
+        self._stop = stop_event or threading.Event()
+        self._threads = []
+        self._started = time.perf_counter()
+        self._rendered = 0
+        self.frame_time = None
+
+    def start(self):
+        """Start the capture and inference threads."""
+        if self._threads:
+            return
+        self._started = time.perf_counter()
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name='pipeline-capture', daemon=True),
+            threading.Thread(target=self._inference_loop, name='pipeline-inference', daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout=2.0):
+        """
+        Stop the worker threads and log the stage timings.
+
+        Args:
+            timeout: Seconds to wait for the worker threads, shared by all
+
+        Returns:
+            True if every worker thread has exited
+        """
+        self._stop.set()
+        self._frames.close()
+        self._results.close()
+        deadline = time.perf_counter() + timeout
+        stuck = []
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(max(deadline - time.perf_counter(), 0.0))
+                if thread.is_alive():
+                    stuck.append(thread.name)
+        if stuck:
+            logger.warning(f"Pipeline threads did not stop within {timeout}s: {stuck}")
+        if self._threads:
+            self._threads = []
+            logger.info(f"Pipeline stats: {self.stats()}")
+        return not stuck
+
+    def stats(self):
+        """
+        Get pipeline throughput and per-stage timings.
+
+        Returns:
+            Dict with fps, dropped frame counts and per-stage timings
+        """
+        elapsed = time.perf_counter() - self._started
+        return {
+            'fps': self._rendered / elapsed if elapsed > 0 else 0.0,
+            'dropped_capture': self._frames.dropped,
+            'dropped_inference': self._results.dropped,
+            'stages': self.timings.summary(),
+        }
+
+    def _capture_loop(self):
+        try:
+            while not self._stop.is_set() and self.cap.isOpened():
+                start = time.perf_counter()
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+                if frame is None:
+                    continue
+                captured = getattr(self.cap, 'timestamp', None) or start
+                read = time.perf_counter()
+                self.timings.record('capture', read - start)
+                if self.flip:
+                    frame = cv2.flip(frame, 1)
+                    self.timings.record('flip', time.perf_counter() - read)
+                if self._frames.put((frame, captured)):
+                    self.timings.count('dropped_capture')
+        except Exception as e:
+            logger.error(f"Error in capture stage: {e}", exc_info=True)
+        finally:
+            self._frames.close()
+
+    def _inference_loop(self):
+        small = rgb = None
+        try:
+            while not self._stop.is_set():
+                item = self._frames.get()
+                if item is None:
+                    break
+                frame, captured = item
+                start = time.perf_counter()
+                if self.due is not None and not self.due():
+                    # Skipped by the scheduler, which will not look at the image
+                    results = self.process(None)
+                    self.timings.record('inference', time.perf_counter() - start)
+                    if self._results.put((frame, results, captured)):
+                        self.timings.count('dropped_inference')
+                    continue
+                # The downscaled and RGB copies only live for the process()
+                # call, so their buffers are reused for every frame of the same
+                # size. INTER_LINEAR is several times faster than INTER_AREA
+                # at these ratios, and the model resizes its input again anyway.
+                image = frame if self.roi is None else self.roi.crop(frame)
+                height, width = image.shape[:2]
+                if self.inference_width and width > self.inference_width:
+                    size = (self.inference_width, max(height * self.inference_width // width, 1))
+                    if small is None or small.shape[1::-1] != size:
+                        small = cv2.resize(image, size, interpolation=cv2.INTER_LINEAR)
+                    else:
+                        cv2.resize(image, size, dst=small, interpolation=cv2.INTER_LINEAR)
+                    image = small
+                if rgb is None or rgb.shape != image.shape:
+                    rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+                else:
+                    cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=rgb)
+                converted = time.perf_counter()
+                self.timings.record('convert', converted - start)
+                rgb.flags.writeable = False
+                results = self.process(rgb)
+                rgb.flags.writeable = True
+                self.timings.record('inference', time.perf_counter() - converted)
+                if self._results.put((frame, results, captured)):
+                    self.timings.count('dropped_inference')
+        except Exception as e:
+            logger.error(f"Error in inference stage: {e}", exc_info=True)
+        finally:
+            self._results.close()
+
+    def __iter__(self):
+        self.start()
+        try:
+            while not self._stop.is_set():
+                item = self._results.get(self.POLL_INTERVAL)
+                if item is None:
+                    if self._results.closed:
+                        break
+                    continue
+                frame, results, self.frame_time = item
+                start = time.perf_counter()
+                yield frame, results
+                end = time.perf_counter()
+                self.timings.record('render', end - start)
+                self.timings.record('latency', end - self.frame_time)
+                self._rendered += 1
+        finally:
+            self.stop()
@@ -0,0 +1,201 @@
+"""
+Pool of ready MediaPipe Pose instances.
+Building a Pose graph and loading its model takes hundreds of milliseconds,
+so sessions check instances out of a shared pool and return them, reset,
+when they end. Instances are keyed by the settings they were built with,
+and at most POSE_POOL_SIZE idle instances are kept in total.
+"""
+import collections
+import contextlib
+import logging
+import threading
+import config
+
+logger = logging.getLogger(__name__)
+
+# Keyword arguments of mediapipe.solutions.pose.Pose
+PoseSettings = collections.namedtuple('PoseSettings', [
+    'min_detection_confidence', 'min_tracking_confidence', 'model_complexity',
+    'smooth_landmarks', 'enable_segmentation'
+])
+
+
+def current_settings():
+    """
+    Get the Pose settings from the configuration.
+
+    Returns:
+        PoseSettings
+    """
+    return PoseSettings(config.MIN_DETECTION_CONFIDENCE, config.MIN_TRACKING_CONFIDENCE,
+                        config.MODEL_COMPLEXITY, config.SMOOTH_LANDMARKS, False)
+
+
+def profile_settings(name):
+    """
+    Get the settings of a performance profile.
+
+    Args:
+        name: Key of config.PERFORMANCE_PROFILES, e.g. 'lite'
+
+    Returns:
+        Tuple of (PoseSettings, inference width in pixels, 0 for full size)
+    """
+    profile = config.PERFORMANCE_PROFILES[name]
+    settings = PoseSettings(config.MIN_DETECTION_CONFIDENCE, config.MIN_TRACKING_CONFIDENCE,
+                            profile['model_complexity'], profile['smooth_landmarks'], False)
+    return settings, profile['inference_width']
+
+
+def create_pose(settings=None):
+    """
+    Create a MediaPipe Pose instance, outside of any pool.
+
+    Args:
+        settings: PoseSettings (default current_settings())
+
+    Returns:
+        mediapipe.solutions.pose.Pose
+    """
+    # Imported here so the server starts without loading MediaPipe
+    import mediapipe as mp
+    settings = settings or current_settings()
+    return mp.solutions.pose.Pose(**settings._asdict())
+
+
+class PosePool:
+    """
+    Keeps idle Pose instances for reuse, bounded in total.
+
+    When the pool is full, returning an instance closes the least recently
+    returned idle one, whatever its settings.
+    """
+
+    def __init__(self, size=None, factory=create_pose):
+        """
+        Args:
+            size: Maximum idle instances kept (default config.POSE_POOL_SIZE)
+            factory: Callable creating a Pose from PoseSettings
+        """
+        self.size = config.POSE_POOL_SIZE if size is None else size
+        self.factory = factory
+        self.created = 0
+        self.reused = 0
+        self._idle = collections.OrderedDict()  # id(pose) -> (settings, pose), oldest first
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def acquire(self, settings=None):
+        """
+        Check out an idle Pose with these settings, or create one.
+
+        Args:
+            settings: PoseSettings (default current_settings())
+
+        Returns:
+            Pose instance, owned by the caller until release()
+        """
+        settings = settings or current_settings()
+        with self._lock:
+            for key, (idle_settings, pose) in reversed(self._idle.items()):
+                if idle_settings == settings:
+                    del self._idle[key]
+                    self.reused += 1
+                    return pose
+            self.created += 1
+        return self.factory(settings)
+
+    def release(self, pose, settings=None):
+        """
+        Return a checked-out Pose, reset for the next session.
+
+        Args:
+            pose: Pose from acquire()
+            settings: The settings it was acquired with (default current_settings())
+        """
+        settings = settings or current_settings()
+        try:
+            # Clears the tracking state so the next session starts with detection
+            pose.reset()
+        except Exception as e:
+            logger.warning(f"Discarding Pose that could not be reset: {e}")
+            self._close(pose)
+            return
+        evicted = []
+        with self._lock:
+            if self._closed or self.size <= 0:
+                evicted.append(pose)
+            else:
+                self._idle[id(pose)] = (settings, pose)
+                while len(self._idle) > self.size:
+                    evicted.append(self._idle.popitem(last=False)[1][1])
+        for pose in evicted:
+            self._close(pose)
+
+    @contextlib.contextmanager
+    def checkout(self, settings=None):
+        """
+        Use a pooled Pose for the duration of a with block.
+
+        An instance that raised is closed instead of being returned, since
+        its graph may be in a bad state.
+
+        Args:
+            settings: PoseSettings (default current_settings())
+
+        Yields:
+            Pose instance
+        """
+        settings = settings or current_settings()
+        pose = self.acquire(settings)
+        try:
+            yield pose
+        except BaseException:
+            self._close(pose)
+            raise
+        self.release(pose, settings)
+
+    def idle_count(self):
+        with self._lock:
+            return len(self._idle)
+
+    def stats(self):
+        """
+        Returns:
+            Dict of idle, created and reused instance counts and the pool size
+        """
+        return {'size': self.size, 'idle': self.idle_count(), 'created': self.created, 'reused': self.reused}
+
+    def close(self):
+        """Close all idle instances; instances returned later are closed too."""
+        with self._lock:
+            self._closed = True
+            idle = [pose for _, pose in self._idle.values()]
+            self._idle.clear()
+        for pose in idle:
+            self._close(pose)
+
+    @staticmethod
+    def _close(pose):
+        try:
+            pose.close()
+        except Exception as e:
+            logger.warning(f"Error closing Pose: {e}")
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Get the process-wide PosePool, creating it on first use.
+
+    Returns:
+        PosePool shared by all detection runs
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PosePool()
+        return _pool
@@ -0,0 +1,139 @@
+"""
+Performance profile benchmark.
+Scores the same recorded clip with each of config.PERFORMANCE_PROFILES and
+reports processing FPS and how well each profile's reps agree with a
+reference, to pick the cheapest profile that still counts correctly on a
+given machine.
+
+The reference is the expected rep count if given, otherwise the results of
+the most accurate (last) profile benchmarked.
+
+Usage:
+    python lib/profile_bench.py bicep_curls session.mp4 --expected 10
+"""
+import argparse
+import json
+import logging
+import sys
+import config
+import counters
+import scheduler
+import score
+
+logger = logging.getLogger(__name__)
+
+
+def rep_agreement(rep_frames, reference_frames, tolerance):
+    """
+    Measure how well two lists of rep frames agree.
+
+    Each rep matches at most one reference rep within tolerance frames.
+    Matches are divided by the larger rep count, so missed and extra reps
+    both lower the agreement, and it is 1.0 only for the same reps at about
+    the same time.
+
+    Args:
+        rep_frames: Frames on which reps completed
+        reference_frames: Frames on which the reference reps completed
+        tolerance: Frames a rep may be off from its reference rep
+
+    Returns:
+        Float in [0, 1]
+    """
+    if not rep_frames and not reference_frames:
+        return 1.0
+    unmatched = list(rep_frames)
+    matched = 0
+    for frame in reference_frames:
+        nearest = min(unmatched, key=lambda rep: abs(rep - frame), default=None)
+        if nearest is not None and abs(nearest - frame) <= tolerance:
+            unmatched.remove(nearest)
+            matched += 1
+    return matched / max(len(rep_frames), len(reference_frames))
+
+
+def benchmark_profile(exercise_type, target, profile, policy=None):
+    """
+    Score a clip with one profile.
+
+    Returns:
+        Dict with the profile, its settings, processing FPS, reps and rep frames
+    """
+    result = score.score_source(exercise_type, target, policy=policy, profile=profile)
+    return {
+        'profile': profile,
+        **config.PERFORMANCE_PROFILES[profile],
+        'processing_fps': result['processing_fps'],
+        'inference_ms': result['pipeline']['stages'].get('inference', {}).get('mean_ms'),
+        'frames': result['frames'],
+        'fps': result['fps'],
+        'pose_frames': result['pose_frames'],
+        'reps': result['reps'],
+        'rep_frames': result['rep_frames'],
+    }
+
+
+def benchmark_profiles(exercise_type, target, profiles=None, expected=None, tolerance=None, policy=None):
+    """
+    Score a clip with several profiles and compare their reps.
+
+    Args:
+        exercise_type: Exercise type, e.g. 'bicep_curls'
+        target: Video file or image directory
+        profiles: Profile names, cheapest first (default all profiles)
+        expected: Known rep count of the clip; if None, the last profile's
+            results are the reference
+        tolerance: Frames a rep may be off from the reference rep (default
+            a quarter of a second at the clip's frame rate)
+        policy: Inference scheduling policy (default config.INFERENCE_POLICY)
+
+    Returns:
+        Tuple of (list of per-profile result dicts, recommended profile name
+        or None if no profile agrees)
+    """
+    profiles = list(profiles or config.PERFORMANCE_PROFILES)
+    results = [benchmark_profile(exercise_type, target, profile, policy) for profile in profiles]
+
+    reference = results[-1]
+    if tolerance is None:
+        tolerance = max(round(0.25 * (reference['fps'] or config.REPLAY_FPS)), 1)
+    for result in results:
+        if expected is not None:
+            result['reps_match'] = result['reps'] == expected
+        else:
+            result['reps_match'] = result['reps'] == reference['reps']
+            result['rep_agreement'] = rep_agreement(result['rep_frames'], reference['rep_frames'], tolerance)
+
+    recommended = next((result['profile'] for result in results if result['reps_match']
+                        and result.get('rep_agreement', 1.0) == 1.0), None)
+    return results, recommended
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare performance profiles on one recorded clip")
+    parser.add_argument('exercise', choices=sorted(counters.EXERCISES), help="Exercise type")
+    parser.add_argument('source', help="Video file or image directory")
+    parser.add_argument('--profiles', nargs='+', choices=list(config.PERFORMANCE_PROFILES), default=None,
+                        help="Profiles to compare, cheapest first (default all)")
+    parser.add_argument('--expected', type=int, default=None,
+                        help="Known rep count (default: compare with the last profile)")
+    parser.add_argument('--tolerance', type=int, default=None,
+                        help="Frames a rep may be off from the reference (default: a quarter second)")
+    parser.add_argument('--policy', choices=scheduler.POLICIES, default=None,
+                        help="Inference scheduling policy (default from config)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    results, recommended = benchmark_profiles(args.exercise, args.source, args.profiles, args.expected,
+                                              args.tolerance, args.policy)
+    for result in results:
+        print(json.dumps(result))
+    print(json.dumps({'recommended': recommended}))
+    if recommended is None:
+        print("No profile agrees with the reference", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,354 @@
+"""
+Session recordings.
+Appends every frame of a detection run (landmarks, timestamp, stage, reps,
+form errors and events) to a compact binary file of fixed-size records,
+which reads back as memory-mapped NumPy arrays for replay, analytics and
+regression tests.
+
+File layout: MAGIC, a little-endian uint32 header length, a JSON header
+(exercises, stage and form-error names, landmark encoding), padding to a
+multiple of 8 bytes, then one RECORD_FIELDS record per frame. A trailing
+partial record left by a crash is ignored on reading.
+"""
+import argparse
+import json
+import logging
+import re
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+import config
+import counters
+import landmarks
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'EXREC\x00\x01\x00'
+EXTENSION = '.exrec'
+
+# Quantized landmarks are stored as round(value * QUANT_SCALE) in int16,
+# i.e. 1/8192 resolution over +-4; frames without a pose hold QUANT_EMPTY
+QUANT_SCALE = 8192.0
+QUANT_EMPTY = np.iinfo(np.int16).min
+
+# Bits of a record's events field
+EVENT_REP = 1
+EVENT_STAGE = 2
+EVENT_FORM_ERROR = 4
+EVENT_NO_POSE = 8
+
+# Per-frame record fields; exercise and stage are indexes into the header's
+# exercises and stages lists (-1 for none), form_errors a bit per header
+# form_errors entry
+RECORD_FIELDS = [
+    ('timestamp', '<f8'),
+    ('frame', '<u4'),
+    ('reps', '<u2'),
+    ('form_errors', '<u2'),
+    ('exercise', 'i1'),
+    ('stage', 'i1'),
+    ('events', 'u1'),
+    ('reserved', 'u1'),
+]
+
+
+def record_dtype(quantized):
+    """
+    Get the NumPy dtype of one record.
+
+    Args:
+        quantized: Landmarks stored as int16 instead of float32
+
+    Returns:
+        Structured dtype
+    """
+    return np.dtype(RECORD_FIELDS + [('landmarks', '<i2' if quantized else '<f4', (landmarks.NUM_LANDMARKS, 4))])
+
+
+def counter_layout(counter):
+    """
+    Get the exercise, stage and form-error names a counter can report.
+
+    Args:
+        counter: ExerciseCounter or MultiCounter
+
+    Returns:
+        Tuple of (exercises, stages, form_errors) name lists
+    """
+    members = list(counter.counters.values()) if isinstance(counter, counters.MultiCounter) else [counter]
+    exercises = [member.name for member in members]
+    stages, form_errors = [], []
+    for member in members:
+        for rule in member.exercise.rules:
+            if rule.stage not in stages:
+                stages.append(rule.stage)
+        for check in member.exercise.form_checks:
+            if check.name not in form_errors:
+                form_errors.append(check.name)
+    return exercises, stages, form_errors
+
+
+class RecordingWriter:
+    """
+    Appends one fixed-size record per frame to a recording file.
+
+    A record is filled in place in a preallocated buffer and handed to a
+    buffered file, so writing costs a few microseconds per frame.
+    """
+
+    def __init__(self, path, counter, quantize=None, meta=None):
+        """
+        Args:
+            path: Output file; parent directories are created
+            counter: ExerciseCounter or MultiCounter whose state is recorded
+            quantize: Store landmarks as int16 (default config.RECORDING_QUANTIZE)
+            meta: Optional extra JSON-serializable header fields, e.g. source
+        """
+        self.path = Path(path)
+        self.quantize = config.RECORDING_QUANTIZE if quantize is None else quantize
+        self.exercises, self.stages, form_errors = counter_layout(counter)
+        if len(form_errors) > 16:
+            raise ValueError(f"At most 16 form checks can be recorded, got {len(form_errors)}")
+        self.form_errors = {name: 1 << bit for bit, name in enumerate(form_errors)}
+        self.header = {
+            **(meta or {}),
+            'exercises': self.exercises,
+            'stages': self.stages,
+            'form_errors': form_errors,
+            'quantized': self.quantize,
+            'quant_scale': QUANT_SCALE,
+            'started': datetime.now().isoformat(),
+        }
+        self.frames = 0
+
+        self._record = np.zeros((), dtype=record_dtype(self.quantize))
+        self._scaled = np.empty((landmarks.NUM_LANDMARKS, 4), dtype=np.float32)
+        self._previous = (0, -1, 0)
+        self._start = time.perf_counter()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'xb')
+        header = json.dumps(self.header).encode()
+        padding = -(len(MAGIC) + 4 + len(header)) % 8
+        self._file.write(MAGIC + len(header).to_bytes(4, 'little') + header + b' ' * padding)
+
+    def write(self, points, counter):
+        """
+        Append the current frame.
+
+        Args:
+            points: Landmark array of shape (33, D) for this frame, or None
+                if no pose was detected
+            counter: The counter, already updated with this frame
+        """
+        record = self._record
+        exercise = counter.name
+        stage = counter.stage
+        reps = counter.reps
+        exercise_code = self.exercises.index(exercise) if exercise is not None else -1
+        stage_code = self.stages.index(stage) if stage is not None else -1
+        errors = 0
+        for name, active in counter.form_errors.items():
+            if active:
+                errors |= self.form_errors[name]
+
+        previous_reps, previous_stage, previous_errors = self._previous
+        events = 0
+        if reps != previous_reps:
+            events |= EVENT_REP
+        if stage_code != previous_stage:
+            events |= EVENT_STAGE
+        if errors & ~previous_errors:
+            events |= EVENT_FORM_ERROR
+        if points is None:
+            events |= EVENT_NO_POSE
+        self._previous = (reps, stage_code, errors)
+
+        record['timestamp'] = time.perf_counter() - self._start
+        record['frame'] = self.frames
+        record['reps'] = reps
+        record['form_errors'] = errors
+        record['exercise'] = exercise_code
+        record['stage'] = stage_code
+        record['events'] = events
+        target = record['landmarks']
+        if points is None:
+            target[...] = QUANT_EMPTY if self.quantize else np.nan
+        elif self.quantize:
+            np.multiply(points[:, :4], QUANT_SCALE, out=self._scaled)
+            np.clip(self._scaled, -32767, 32767, out=self._scaled)
+            np.rint(self._scaled, out=target, casting='unsafe')
+        else:
+            target[...] = points[:, :4]
+
+        self._file.write(record.data)
+        self.frames += 1
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+            logger.info(f"Recorded {self.frames} frames to {self.path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Recording:
+    """
+    Read-only view of a recording file.
+
+    The records are memory-mapped, so opening is O(1) and each field is a
+    NumPy array view without any per-frame parsing.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path: Recording file
+
+        Raises:
+            ValueError: If the file is not a recording
+        """
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            magic = f.read(len(MAGIC))
+            if magic != MAGIC:
+                raise ValueError(f"{self.path} is not a recording")
+            length = int.from_bytes(f.read(4), 'little')
+            self.header = json.loads(f.read(length))
+        offset = len(MAGIC) + 4 + length
+        offset += -offset % 8
+
+        dtype = record_dtype(self.header['quantized'])
+        count = (self.path.stat().st_size - offset) // dtype.itemsize
+        if count:
+            self.records = np.memmap(self.path, dtype=dtype, mode='r', offset=offset, shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype=dtype)
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def exercises(self):
+        return self.header['exercises']
+
+    @property
+    def stages(self):
+        return self.header['stages']
+
+    @property
+    def form_errors(self):
+        return self.header['form_errors']
+
+    @property
+    def timestamps(self):
+        """Seconds since the recording started, per frame."""
+        return self.records['timestamp']
+
+    @property
+    def reps(self):
+        return self.records['reps']
+
+    @property
+    def events(self):
+        """EVENT_* bit mask per frame."""
+        return self.records['events']
+
+    def stage_names(self):
+        """
+        Returns:
+            List of stage names (None for no stage), one per frame
+        """
+        names = self.stages + [None]
+        return [names[code] for code in self.records['stage']]
+
+    def form_error_mask(self, name):
+        """
+        Returns:
+            Boolean array, True on frames where the named form error was active
+        """
+        return (self.records['form_errors'] & (1 << self.form_errors.index(name))) != 0
+
+    def track(self):
+        """
+        Get the landmarks in the layout used by score.py and sweep.py.
+
+        Returns:
+            float32 array of shape (T, 33, 4), NaN rows for frames without a pose
+        """
+        raw = self.records['landmarks']
+        if not self.header['quantized']:
+            return np.asarray(raw)
+        track = raw.astype(np.float32)
+        track /= self.header['quant_scale']
+        track[(self.records['events'] & EVENT_NO_POSE) != 0] = np.nan
+        return track
+
+    def _onsets(self, name):
+        mask = self.form_error_mask(name)
+        return int(np.count_nonzero(mask[1:] & ~mask[:-1]) + (len(mask) > 0 and mask[0]))
+
+    def summary(self):
+        """
+        Returns:
+            JSON-serializable dict describing the recording
+        """
+        return {
+            'path': str(self.path),
+            **{key: value for key, value in self.header.items() if key not in ('quant_scale',)},
+            'frames': len(self),
+            'duration': float(self.timestamps[-1]) if len(self) else 0.0,
+            'reps': int(self.reps[-1]) if len(self) else 0,
+            'no_pose_frames': int(np.count_nonzero(self.events & EVENT_NO_POSE)),
+            'form_errors_raised': {name: self._onsets(name) for name in self.form_errors},
+        }
+
+
+def new_path(session_id, directory=None):
+    """
+    Get a fresh file path for recording a session.
+
+    The name ends in a random suffix, so sessions started within the same
+    second never collide.
+
+    Args:
+        session_id: Session ID, used in the file name
+        directory: Output directory (default config.RECORDING_DIR)
+
+    Returns:
+        Path
+
+    Raises:
+        ValueError: If the session ID is not a plain file name part
+    """
+    if not re.fullmatch(r'[A-Za-z0-9_-]+', session_id):
+        raise ValueError(f"Session ID {session_id!r} cannot be used in a file name")
+    directory = Path(directory or config.RECORDING_DIR)
+    return directory / f"{session_id}-{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}{EXTENSION}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize session recordings")
+    parser.add_argument('recordings', nargs='+', help="Recording files")
+    parser.add_argument('--export', metavar='DIR',
+                        help="Also save each landmark track as a (T, 33, 4) .npy file in DIR, e.g. for sweep.py")
+    args = parser.parse_args(argv)
+
+    for path in args.recordings:
+        recording = Recording(path)
+        print(json.dumps(recording.summary()))
+        if args.export:
+            export_dir = Path(args.export)
+            export_dir.mkdir(parents=True, exist_ok=True)
+            np.save(export_dir / f"{Path(path).stem}.npy", recording.track())
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
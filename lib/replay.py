@@ -0,0 +1,317 @@
+"""
+Deterministic replay of recorded landmark tracks.
+Feeds fixture tracks through the exercise counters, without camera or
+MediaPipe, and checks the reps and form errors against the expected
+results, or benchmarks the counting logic in frames/sec.
+
+A fixture is a JSON file next to its track:
+
+    {
+        "exercise": "bicep_curls",
+        "track": "bicep_curls.exrec",
+        "fps": 30.0,
+        "expected": {"reps": 5, "rep_frames": [...], "form_errors": {"hands_too_high": []}}
+    }
+
+The track path is relative to the fixture and points to a recording.py
+file or a (T, 33, 4) .npy array. Expected form_errors map each check to
+the frames on which it started, or to the number of times it started;
+rep_frames may be left out to check only the rep count.
+
+Usage:
+    python lib/replay.py check
+    python lib/replay.py policies
+    python lib/replay.py capture bicep_curls session.exrec -o fixtures/replay/curls.json
+    python lib/replay.py bench --repeat 50
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from pathlib import Path
+import numpy as np
+import config
+import counters
+import recording
+import scheduler
+import score
+
+logger = logging.getLogger(__name__)
+
+FIXTURE_EXTENSION = '.json'
+
+# Scheduling policies that must count the same reps as every-frame inference
+# on every fixture, as (policy, schedule overrides)
+POLICY_CHECKS = (
+    ('fixed', {'interval': 2}),
+    ('fixed', {'interval': 3}),
+    ('adaptive', {}),
+)
+
+
+def load_track(path):
+    """
+    Load a landmark track from a recording or .npy file.
+
+    Returns:
+        float32 array of shape (T, 33, 4), NaN rows for frames without a pose
+    """
+    path = Path(path)
+    if path.suffix == recording.EXTENSION:
+        return recording.Recording(path).track()
+    return np.load(path).astype(np.float32, copy=False)
+
+
+def load_fixture(path):
+    """
+    Load a fixture and its track.
+
+    Returns:
+        Tuple of (fixture dict, track array)
+    """
+    path = Path(path)
+    with open(path) as f:
+        fixture = json.load(f)
+    return fixture, load_track(path.parent / fixture['track'])
+
+
+def find_fixtures(paths=None):
+    """
+    Expand fixture files and directories.
+
+    Args:
+        paths: Fixture files or directories (default config.REPLAY_FIXTURE_DIR)
+
+    Returns:
+        Sorted list of fixture paths
+    """
+    found = []
+    for path in map(Path, paths or [config.REPLAY_FIXTURE_DIR]):
+        if path.is_dir():
+            found.extend(sorted(path.glob(f"*{FIXTURE_EXTENSION}")))
+        else:
+            found.append(path)
+    return found
+
+
+def replay(exercise_type, track, fps=None, thresholds=None):
+    """
+    Run an exercise's counting logic over a track, every frame.
+
+    Returns:
+        Result dict as produced by score.ScoreRecorder.result
+    """
+    return score.score_track(exercise_type, track, fps or config.REPLAY_FPS, 'every_frame', thresholds)
+
+
+def expectations(result):
+    """
+    Get the fixture expectations matching a replay result.
+
+    Returns:
+        Dict of reps, rep_frames and form error start frames
+    """
+    return {
+        'reps': result['reps'],
+        'rep_frames': result['rep_frames'],
+        'form_errors': result['form_errors'],
+    }
+
+
+def compare(expected, result):
+    """
+    Compare a replay result with a fixture's expectations.
+
+    Returns:
+        List of mismatch descriptions, empty if the result matches
+    """
+    mismatches = []
+    if result['reps'] != expected['reps']:
+        mismatches.append(f"reps: expected {expected['reps']}, got {result['reps']}")
+    if 'rep_frames' in expected and result['rep_frames'] != expected['rep_frames']:
+        mismatches.append(f"rep_frames: expected {expected['rep_frames']}, got {result['rep_frames']}")
+    for name, frames in expected.get('form_errors', {}).items():
+        actual = result['form_errors'].get(name)
+        if actual is None:
+            mismatches.append(f"form error {name}: no such check")
+        elif isinstance(frames, int) and len(actual) != frames:
+            mismatches.append(f"form error {name}: expected {frames} times, got {len(actual)}")
+        elif not isinstance(frames, int) and actual != frames:
+            mismatches.append(f"form error {name}: expected at frames {frames}, got {actual}")
+    return mismatches
+
+
+def check_fixture(path):
+    """
+    Replay one fixture and compare the result with its expectations.
+
+    Returns:
+        Dict with the fixture path, exercise, pass flag and mismatches
+    """
+    fixture, track = load_fixture(path)
+    result = replay(fixture['exercise'], track, fixture.get('fps'), fixture.get('thresholds'))
+    mismatches = compare(fixture['expected'], result)
+    return {
+        'fixture': str(path),
+        'exercise': fixture['exercise'],
+        'frames': result['frames'],
+        'reps': result['reps'],
+        'passed': not mismatches,
+        'mismatches': mismatches,
+    }
+
+
+def check_policies(path, policies=POLICY_CHECKS):
+    """
+    Check that scheduling policies count the same reps on a fixture as
+    every-frame inference.
+
+    Args:
+        path: Fixture file
+        policies: Sequence of (policy, schedule overrides)
+
+    Returns:
+        List of scheduler.compare_to_every_frame results, one per policy,
+        with the fixture path and schedule added
+    """
+    fixture, track = load_fixture(path)
+    results = []
+    for policy, schedule in policies:
+        result = scheduler.compare_to_every_frame(track, fixture['exercise'], policy, schedule)
+        result['fixture'] = str(path)
+        result['schedule'] = schedule
+        results.append(result)
+    return results
+
+
+def capture_fixture(exercise_type, track_path, output, fps=None, thresholds=None):
+    """
+    Write a fixture whose expectations are the current results for a track.
+
+    Review the written results before committing the fixture: it pins
+    whatever the counter does today.
+
+    Args:
+        exercise_type: Exercise type, e.g. 'bicep_curls'
+        track_path: Recording or .npy track
+        output: Fixture file to write
+        fps: Frame rate of the track (default config.REPLAY_FPS)
+        thresholds: Optional threshold overrides to store in the fixture
+
+    Returns:
+        The fixture dict
+    """
+    output = Path(output)
+    track_path = Path(track_path)
+    result = replay(exercise_type, load_track(track_path), fps, thresholds)
+    fixture = {
+        'exercise': exercise_type,
+        'track': os.path.relpath(track_path, output.parent),
+        'fps': fps or config.REPLAY_FPS,
+        'expected': expectations(result),
+    }
+    if thresholds:
+        fixture['thresholds'] = thresholds
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(fixture, f, indent=2)
+    return fixture
+
+
+def benchmark(exercise_type, track, repeat=None):
+    """
+    Measure the throughput of an exercise's counting logic alone.
+
+    Args:
+        exercise_type: Exercise type, e.g. 'bicep_curls'
+        track: Landmark track of shape (T, 33, 4)
+        repeat: Passes over the track (default config.REPLAY_BENCH_REPEAT)
+
+    Returns:
+        Dict with frames counted, elapsed seconds and frames/sec
+    """
+    repeat = repeat or config.REPLAY_BENCH_REPEAT
+    frames = [None if np.isnan(points[0, 0]) else points for points in np.asarray(track)]
+    counter = counters.create_counter(exercise_type)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        counter.reset()
+        for points in frames:
+            counter.update(points)
+    elapsed = time.perf_counter() - start
+    total = repeat * len(frames)
+    return {
+        'exercise': exercise_type,
+        'frames': total,
+        'elapsed_s': elapsed,
+        'fps': total / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay landmark fixtures through the exercise counters")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    check = commands.add_parser('check', help="Check fixtures against their expected results")
+    check.add_argument('fixtures', nargs='*', help="Fixture files or directories (default fixtures/replay)")
+
+    policies = commands.add_parser('policies',
+                                   help="Check that scheduling policies count the same reps as every frame")
+    policies.add_argument('fixtures', nargs='*', help="Fixture files or directories (default fixtures/replay)")
+
+    capture = commands.add_parser('capture', help="Write a fixture pinning the current results for a track")
+    capture.add_argument('exercise', choices=sorted(counters.EXERCISES), help="Exercise type")
+    capture.add_argument('track', help="Recording or .npy landmark track")
+    capture.add_argument('-o', '--output', required=True, help="Fixture file to write")
+    capture.add_argument('--fps', type=float, default=None)
+
+    bench = commands.add_parser('bench', help="Measure counting throughput on fixture tracks")
+    bench.add_argument('fixtures', nargs='*', help="Fixture files or directories (default fixtures/replay)")
+    bench.add_argument('--repeat', type=int, default=None, help="Passes over each track")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.command == 'capture':
+        fixture = capture_fixture(args.exercise, args.track, args.output, args.fps)
+        print(json.dumps(fixture['expected']))
+        return 0
+
+    paths = find_fixtures(args.fixtures)
+    if not paths:
+        print("No fixtures found")
+        return 1
+
+    if args.command == 'bench':
+        total_frames = total_elapsed = 0.0
+        for path in paths:
+            fixture, track = load_fixture(path)
+            result = benchmark(fixture['exercise'], track, args.repeat)
+            result['fixture'] = str(path)
+            total_frames += result['frames']
+            total_elapsed += result['elapsed_s']
+            print(json.dumps(result))
+        print(json.dumps({'total_frames': int(total_frames),
+                          'fps': total_frames / total_elapsed if total_elapsed > 0 else 0.0}))
+        return 0
+
+    if args.command == 'policies':
+        results = [result for path in paths for result in check_policies(path)]
+        for result in results:
+            print(json.dumps(result))
+        failures = sum(not result['match'] for result in results)
+        print(f"{len(results) - failures}/{len(results)} policy checks passed")
+        return 1 if failures else 0
+
+    failures = 0
+    for path in paths:
+        result = check_fixture(path)
+        failures += not result['passed']
+        print(json.dumps(result))
+    print(f"{len(paths) - failures}/{len(paths)} fixtures passed")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,132 @@
+"""
+Region-of-interest tracking for pose inference.
+Crops each frame to the area around the previous frame's pose before it is
+downscaled, converted to RGB and passed to MediaPipe, and maps the landmarks
+back to full-frame coordinates. When the pose is lost, the next frame is
+processed whole.
+"""
+import numpy as np
+import config
+
+
+class RoiTracker:
+    """
+    Wraps pose.process to run on a crop around the last detected pose.
+
+    FramePipeline calls crop() on every frame before converting it, and the
+    inference callable built on process() maps the results of the cropped
+    frame back. The crop only moves when the pose gets close to its edge or
+    becomes much smaller than it, since MediaPipe tracks the pose across
+    frames in input coordinates.
+    """
+
+    # Crops covering more of the frame than this are not worth making
+    FULL_FRAME_AREA = 0.6
+
+    def __init__(self, process, margin=None, min_size=None):
+        """
+        Args:
+            process: Inference callable taking an RGB image, e.g. pose.process
+            margin: Space added around the pose on every side, as a fraction
+                of its width and height (default config.ROI_MARGIN)
+            min_size: Smallest crop side in pixels (default config.ROI_MIN_SIZE)
+        """
+        self._process = process
+        self.margin = config.ROI_MARGIN if margin is None else margin
+        self.min_size = config.ROI_MIN_SIZE if min_size is None else min_size
+        self.box = None  # (left, top, right, bottom) pixels of the next crop, None for the full frame
+        self.cropped_frames = 0
+        self.full_frames = 0
+        self.lost = 0
+        self._crop = None  # (left, top, right, bottom, width, height) of the frame being processed
+
+    def crop(self, frame):
+        """
+        Cut the current region out of a BGR frame.
+
+        Args:
+            frame: Full BGR frame
+
+        Returns:
+            View of the region, or the frame itself when tracking is lost
+        """
+        height, width = frame.shape[:2]
+        box = self.box
+        if box is None or box[2] > width or box[3] > height:
+            self._crop = (0, 0, width, height, width, height)
+            return frame
+        left, top, right, bottom = box
+        self._crop = (left, top, right, bottom, width, height)
+        return frame[top:bottom, left:right]
+
+    def process(self, image):
+        """
+        Run inference on the image returned by the last crop().
+
+        Args:
+            image: RGB image of the region, possibly downscaled
+
+        Returns:
+            MediaPipe results with pose_landmarks in full-frame coordinates
+        """
+        results = self._process(image)
+        if self._crop is None:
+            height, width = image.shape[:2]
+            self._crop = (0, 0, width, height, width, height)
+        left, top, right, bottom, width, height = self._crop
+        pose_landmarks = results.pose_landmarks
+        if not pose_landmarks:
+            if self.box is not None:
+                self.lost += 1
+                self.box = None
+            return results
+
+        if (right - left, bottom - top) == (width, height):
+            self.full_frames += 1
+        else:
+            self.cropped_frames += 1
+            scale_x, scale_y = (right - left) / width, (bottom - top) / height
+            offset_x, offset_y = left / width, top / height
+            for lm in pose_landmarks.landmark:
+                lm.x = offset_x + lm.x * scale_x
+                lm.y = offset_y + lm.y * scale_y
+                # z uses the same scale as x
+                lm.z *= scale_x
+        self.box = self._next_box(pose_landmarks, width, height)
+        return results
+
+    def _next_box(self, pose_landmarks, width, height):
+        points = np.array([(lm.x, lm.y) for lm in pose_landmarks.landmark], dtype=np.float32)
+        np.clip(points, 0.0, 1.0, out=points)
+        left, top = points.min(axis=0) * (width, height)
+        right, bottom = points.max(axis=0) * (width, height)
+
+        needed = self._expand(left, top, right, bottom, self.margin, width, height)
+        if self._area(needed) >= self.FULL_FRAME_AREA * width * height:
+            return None
+        current = self.box
+        if current is not None:
+            inner = self._expand(left, top, right, bottom, self.margin / 2, width, height)
+            contains = (current[0] <= inner[0] and current[1] <= inner[1]
+                        and current[2] >= inner[2] and current[3] >= inner[3])
+            if contains and self._area(current) <= 2 * self._area(needed):
+                return current
+        return needed
+
+    def _expand(self, left, top, right, bottom, margin, width, height):
+        pad_x = max((right - left) * margin, (self.min_size - (right - left)) / 2)
+        pad_y = max((bottom - top) * margin, (self.min_size - (bottom - top)) / 2)
+        return (max(int(left - pad_x), 0), max(int(top - pad_y), 0),
+                min(int(np.ceil(right + pad_x)), width), min(int(np.ceil(bottom + pad_y)), height))
+
+    @staticmethod
+    def _area(box):
+        return (box[2] - box[0]) * (box[3] - box[1])
+
+    def stats(self):
+        """
+        Returns:
+            Dict of frames inferred on a crop and on the full frame, and
+            times the pose was lost from a crop
+        """
+        return {'cropped_frames': self.cropped_frames, 'full_frames': self.full_frames, 'lost': self.lost}
@@ -0,0 +1,216 @@
+"""
+Adaptive pose inference scheduling.
+Runs MediaPipe inference only on some frames and extrapolates landmarks on
+the frames in between, following the policy set in config.py.
+"""
+import argparse
+import collections
+import json
+import logging
+import numpy as np
+import config
+import counters
+import landmarks
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ('every_frame', 'fixed', 'adaptive')
+
+# Per-frame output of InferenceScheduler. pose_landmarks is the MediaPipe
+# landmark list from the most recent inference (for drawing), landmarks the
+# (33, 4) array for this frame and inferred whether inference ran on it.
+PoseResult = collections.namedtuple('PoseResult', ['pose_landmarks', 'landmarks', 'inferred'])
+
+
+class LandmarkScheduler:
+    """
+    Decides on which frames to run inference and predicts landmarks for
+    the skipped ones.
+
+    A live stream cannot look at future frames, so skipped frames are
+    filled by linear extrapolation from the last two inferred frames. When
+    the pose is lost, inference runs on every frame until it is found again.
+    """
+
+    def __init__(self, policy=None, schedule=None):
+        """
+        Args:
+            policy: 'every_frame', 'fixed' or 'adaptive' (default config.INFERENCE_POLICY)
+            schedule: Overrides for config.INFERENCE_SCHEDULE
+        """
+        self.policy = policy or config.INFERENCE_POLICY
+        if self.policy not in POLICIES:
+            raise ValueError(f"Unknown inference policy: {self.policy}")
+        self.schedule = {**config.INFERENCE_SCHEDULE, **(schedule or {})}
+        self.interval = self.schedule['interval'] if self.policy == 'fixed' else 1
+        self.inferred_frames = 0
+        self.total_frames = 0
+        self._last = None
+        self._prev = None
+        self._gap = 1
+        self._since = 0
+
+    def due(self):
+        """Whether the next step() will run inference."""
+        return self._last is None or self._since + 1 >= self.interval
+
+    def step(self, infer):
+        """
+        Produce landmarks for the next frame.
+
+        Args:
+            infer: Callable running inference on the frame; returns a
+                landmark array or None if no pose was detected
+
+        Returns:
+            Tuple of (landmark array or None, whether inference ran)
+        """
+        self.total_frames += 1
+        self._since += 1
+        if self._last is None or self._since >= self.interval:
+            self.inferred_frames += 1
+            return self._observe(infer()), True
+        return self._extrapolate(), False
+
+    def _observe(self, points):
+        if points is None:
+            self._last = self._prev = None
+            self._since = 0
+            return None
+
+        self._prev, self._last = self._last, points.copy()
+        self._gap = max(self._since, 1)
+        self._since = 0
+
+        if self.policy == 'adaptive' and self._prev is not None:
+            velocity = np.abs(self._last[:, :2] - self._prev[:, :2]).max() / self._gap
+            threshold = self.schedule['velocity_threshold']
+            if velocity <= 0:
+                self.interval = self.schedule['max_interval']
+            else:
+                self.interval = int(np.clip(threshold / velocity, 1, self.schedule['max_interval']))
+        return self._last
+
+    def _extrapolate(self):
+        if self._prev is None:
+            return self._last.copy()
+        points = self._last.copy()
+        step = self._since / self._gap
+        points[:, :3] += (self._last[:, :3] - self._prev[:, :3]) * step
+        return points
+
+
+class InferenceScheduler:
+    """
+    Scheduled drop-in for pose.process.
+
+    process(image) returns a PoseResult instead of MediaPipe results, so it
+    can be passed straight to pipeline.FramePipeline.
+    """
+
+    def __init__(self, process, policy=None, schedule=None):
+        """
+        Args:
+            process: Inference callable, e.g. pose.process
+            policy: Scheduling policy (default config.INFERENCE_POLICY)
+            schedule: Overrides for config.INFERENCE_SCHEDULE
+        """
+        self._process = process
+        self._buffer = landmarks.LandmarkBuffer()
+        self._pose_landmarks = None
+        self.schedule = LandmarkScheduler(policy, schedule)
+
+    def due(self):
+        """Whether the next process() call will run inference on its image."""
+        return self.schedule.due()
+
+    def process(self, image):
+        """
+        Get landmarks for an RGB image, running inference only when due.
+        The image may be None on frames for which due() returned False.
+
+        Returns:
+            PoseResult for the frame
+        """
+        def infer():
+            self._pose_landmarks = self._process(image).pose_landmarks
+            return self._buffer.update(self._pose_landmarks)
+
+        points, inferred = self.schedule.step(infer)
+        pose_landmarks = self._pose_landmarks if points is not None else None
+        return PoseResult(pose_landmarks, points, inferred)
+
+
+def replay(track, counter, policy=None, schedule=None):
+    """
+    Feed a recorded landmark track through the scheduler into a counter.
+
+    Inference is simulated by reading the recorded frame, so the counter
+    sees exactly what it would have seen live under the given policy.
+
+    Args:
+        track: Array of shape (T, 33, 4); frames without a pose are NaN
+        counter: Anything with update(points), e.g. a counters.ExerciseCounter
+        policy: Scheduling policy (default config.INFERENCE_POLICY)
+        schedule: Overrides for config.INFERENCE_SCHEDULE
+
+    Returns:
+        The LandmarkScheduler used, for its frame statistics
+    """
+    scheduler = LandmarkScheduler(policy, schedule)
+    for frame in track:
+        points, _ = scheduler.step(lambda: None if np.isnan(frame[0, 0]) else frame)
+        counter.update(points)
+    return scheduler
+
+
+def compare_to_every_frame(track, exercise_type, policy=None, schedule=None):
+    """
+    Check that a scheduling policy counts the same reps as full-rate inference.
+
+    Args:
+        track: Recorded landmark track of shape (T, 33, 4)
+        exercise_type: Exercise type, e.g. 'bicep_curls'
+        policy: Scheduling policy to check
+        schedule: Overrides for config.INFERENCE_SCHEDULE
+
+    Returns:
+        Dict with both rep counts, whether they match and the inference ratio
+    """
+    baseline = counters.create_counter(exercise_type)
+    replay(track, baseline, 'every_frame')
+    scheduled = counters.create_counter(exercise_type)
+    scheduler = replay(track, scheduled, policy, schedule)
+    return {
+        'exercise': exercise_type,
+        'policy': scheduler.policy,
+        'every_frame_reps': baseline.reps,
+        'scheduled_reps': scheduled.reps,
+        'match': baseline.reps == scheduled.reps,
+        'inference_ratio': scheduler.inferred_frames / max(scheduler.total_frames, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check a scheduling policy against every-frame inference on recorded landmark tracks")
+    parser.add_argument('exercise', help="Exercise type, e.g. bicep_curls")
+    parser.add_argument('tracks', nargs='+', help="Recordings or landmark tracks saved as (T, 33, 4) .npy files")
+    parser.add_argument('--policy', default=config.INFERENCE_POLICY, choices=POLICIES)
+    parser.add_argument('--interval', type=int, default=config.INFERENCE_SCHEDULE['interval'])
+    args = parser.parse_args()
+    # Imported here because replay imports this module
+    import replay
+
+    mismatches = 0
+    for path in args.tracks:
+        result = compare_to_every_frame(replay.load_track(path), args.exercise, args.policy,
+                                        {'interval': args.interval})
+        result['track'] = path
+        mismatches += not result['match']
+        print(json.dumps(result))
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,188 @@
+"""
+Headless exercise scoring.
+Runs an exercise counter over a video file, image directory or camera
+without any display and writes reps, stage changes and form errors as JSON.
+
+Usage:
+    python lib/score.py bicep_curls session.mp4 -o session.json
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+import config
+import counters
+import landmark_cache
+import pipeline
+import pose_pool
+import roi
+import scheduler
+import sources
+
+logger = logging.getLogger(__name__)
+
+
+class ScoreRecorder:
+    """Collects rep, stage-change and form-error events from a counter."""
+
+    def __init__(self, counter, fps):
+        self.counter = counter
+        self.fps = fps
+        self.frames = 0
+        self.pose_frames = 0
+        self.rep_frames = []
+        self.stage_changes = []
+        self.form_errors = {name: [] for name in counter.form_errors}
+        self._stage = None
+        self._active_errors = set()
+
+    def update(self, points):
+        """Feed one frame's landmarks (or None) to the counter and record events."""
+        frame = self.frames
+        self.frames += 1
+        if points is None:
+            return
+        self.pose_frames += 1
+        if self.counter.update(points):
+            self.rep_frames.append(frame)
+        if self.counter.stage != self._stage:
+            self._stage = self.counter.stage
+            self.stage_changes.append([frame, self._stage])
+        for name, active in self.counter.form_errors.items():
+            if active and name not in self._active_errors:
+                self.form_errors[name].append(frame)
+                self._active_errors.add(name)
+            elif not active:
+                self._active_errors.discard(name)
+
+    def result(self):
+        """
+        Returns:
+            JSON-serializable dict of the scored session
+        """
+        return {
+            'exercise': self.counter.name,
+            'reps': self.counter.reps,
+            'final_stage': self.counter.stage,
+            'frames': self.frames,
+            'pose_frames': self.pose_frames,
+            'fps': self.fps,
+            'rep_frames': self.rep_frames,
+            'stage_changes': self.stage_changes,
+            'form_errors': self.form_errors,
+        }
+
+
+def score_track(exercise_type, track, fps=sources.FrameSource.fps, policy='every_frame', thresholds=None):
+    """
+    Score a recorded landmark track; runs only the counting logic.
+
+    Args:
+        exercise_type: Exercise type, e.g. 'bicep_curls'
+        track: Landmark track of shape (T, 33, 4), NaN rows for no pose
+        fps: Frame rate of the track
+        policy: Inference scheduling policy to emulate
+        thresholds: Optional threshold overrides for the counter
+
+    Returns:
+        Result dict as produced by ScoreRecorder.result
+    """
+    recorder = ScoreRecorder(counters.create_counter(exercise_type, thresholds), fps)
+    schedule = scheduler.replay(track, recorder, policy)
+    result = recorder.result()
+    result['inferred_frames'] = schedule.inferred_frames
+    return result
+
+
+def score_source(exercise_type, target, pose=None, policy=None, cache=None, profile=None):
+    """
+    Score one source as fast as possible, without display or throttling.
+
+    Args:
+        exercise_type: Exercise type, e.g. 'bicep_curls'
+        target: Anything accepted by sources.open_source
+        pose: Optional MediaPipe Pose to reuse; one is created if omitted.
+            A borrowed Pose is reset first, so the result does not depend
+            on what it processed before.
+        policy: Inference scheduling policy (default config.INFERENCE_POLICY)
+        cache: Optional landmark_cache.LandmarkCache; file and directory
+            sources are then scored from their cached landmark track, which
+            is extracted with pose (or a new Pose) on a miss
+        profile: Optional key of config.PERFORMANCE_PROFILES whose Pose
+            settings and inference width are used instead of the configured
+            ones; the cache is not used then
+
+    Returns:
+        Result dict as produced by ScoreRecorder.result, plus timing stats
+    """
+    if cache is not None and profile is None and isinstance(target, (str, Path)) and not str(target).isdigit():
+        start = time.perf_counter()
+        track, fps = cache.load_track(target, pose_pool.create_pose, pose=pose)
+        result = score_track(exercise_type, track, fps, policy or config.INFERENCE_POLICY)
+        result['source'] = str(target)
+        result['elapsed_s'] = time.perf_counter() - start
+        return result
+
+    settings, inference_width = None, config.INFERENCE_WIDTH
+    if profile is not None:
+        settings, inference_width = pose_pool.profile_settings(profile)
+    source = sources.open_source(target)
+    owns_pose = pose is None
+    if owns_pose:
+        pose = pose_pool.create_pose(settings)
+    else:
+        pose.reset()
+    try:
+        recorder = ScoreRecorder(counters.create_counter(exercise_type), source.fps)
+        tracker = roi.RoiTracker(pose.process) if config.ROI_TRACKING else None
+        inference = scheduler.InferenceScheduler(tracker.process if tracker else pose.process, policy)
+        frames = pipeline.FramePipeline(source, inference.process, flip=False, inference_width=inference_width,
+                                        roi=tracker, due=inference.due)
+        start = time.perf_counter()
+        for _, results in frames:
+            recorder.update(results.landmarks)
+        elapsed = time.perf_counter() - start
+
+        result = recorder.result()
+        result['source'] = getattr(source, 'name', None)
+        result['elapsed_s'] = elapsed
+        result['processing_fps'] = recorder.frames / elapsed if elapsed > 0 else 0.0
+        result['inferred_frames'] = inference.schedule.inferred_frames
+        result['pipeline'] = frames.stats()
+        if tracker is not None:
+            result['roi'] = tracker.stats()
+        return result
+    finally:
+        source.release()
+        if owns_pose:
+            pose.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score an exercise session without a display")
+    parser.add_argument('exercise', choices=sorted(counters.EXERCISES), help="Exercise type")
+    parser.add_argument('source', help="Video file, image directory or camera index")
+    parser.add_argument('-o', '--output', help="Write JSON here instead of stdout")
+    parser.add_argument('--policy', choices=scheduler.POLICIES, default=None,
+                        help="Inference scheduling policy (default from config)")
+    parser.add_argument('--cache', action='store_true',
+                        help="Reuse (or store) extracted landmarks in the landmark cache")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    cache = landmark_cache.LandmarkCache() if args.cache else None
+    result = score_source(args.exercise, args.source, policy=args.policy, cache=cache)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+    else:
+        json.dump(result, sys.stdout, indent=2)
+        print()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,401 @@
+"""
+Detection session management.
+Runs several exercise detection sessions in one server process, one per
+camera/station, each with its own frame source, Pose instance and counter,
+on a bounded worker pool. Sessions fed landmarks by clients that run pose
+estimation themselves need no worker and are counted in the request.
+"""
+import logging
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from datetime import datetime
+import numpy as np
+import config
+import engine
+import events
+import pipeline
+import recording
+import sources
+import streaming
+
+logger = logging.getLogger(__name__)
+
+# Session used by the single-exercise API endpoints when no ID is given
+DEFAULT_SESSION_ID = 'default'
+
+# Source name of sessions fed landmarks instead of frames
+LANDMARK_SOURCE = 'landmarks'
+
+# Session IDs end up in file names (recordings), so only these are accepted
+SESSION_ID_PATTERN = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+
+class SessionError(Exception):
+    """Base class for session management errors."""
+
+
+class SessionLimitError(SessionError):
+    """Raised when all worker slots are busy."""
+
+
+class SessionConflictError(SessionError):
+    """Raised when a session ID or source is already in use."""
+
+
+class InvalidSourceError(SessionError):
+    """Raised when a session's source cannot be opened."""
+
+
+class InvalidSessionIdError(SessionError):
+    """Raised when a session ID contains characters outside SESSION_ID_PATTERN."""
+
+
+class Session:
+    """One detection run on one source."""
+
+    def __init__(self, session_id, exercise_type, source, record=False):
+        """
+        Args:
+            session_id: Unique session ID
+            exercise_type: Exercise type, or a list of them for auto-detection
+            source: Camera index or path, as accepted by sources.open_source,
+                or sources.PUSH_SOURCE to take frames pushed by the client
+            record: Record every frame to a file in config.RECORDING_DIR
+        """
+        self.id = session_id
+        self.exercise_type = exercise_type
+        self.source = source
+        self.push_source = sources.PushSource() if source == sources.PUSH_SOURCE else None
+        self.counter = engine.make_counter(exercise_type)
+        self.snapshots = events.EventSlot()
+        self.timings = pipeline.StageTimer()
+        self.video = streaming.FrameBroadcaster()
+        self.recorder = recording.RecordingWriter(
+            recording.new_path(session_id), self.counter,
+            meta={'session_id': session_id, 'source': str(source)}) if record else None
+        self.start_time = datetime.now()
+        self.stop_event = threading.Event()
+        self.future = None
+        self.error = None  # exception that ended the detection run, if any
+
+    @property
+    def active(self):
+        """Whether the session still occupies a worker."""
+        return self.future is None or not self.future.done()
+
+    @property
+    def state(self):
+        """
+        'running', 'stopping' (stop requested, still releasing), 'stopped'
+        or 'failed' (ended by an error).
+        """
+        if not self.active:
+            return 'failed' if self.error is not None else 'stopped'
+        return 'stopping' if self.stop_event.is_set() else 'running'
+
+    def finish(self):
+        """End event and video streams and close the recording."""
+        self.snapshots.close()
+        if self.video is not None:
+            self.video.close()
+        if self.recorder is not None:
+            self.recorder.close()
+
+    def status(self):
+        """
+        Describe the session from its latest snapshot, without touching the
+        detection loop.
+
+        Returns:
+            JSON-serializable dict describing the session
+        """
+        snapshot = self.snapshots.latest
+        state = self.state
+        return {
+            'session_id': self.id,
+            'exercise': self.exercise_type if isinstance(self.exercise_type, str) else 'auto',
+            'detected_exercise': snapshot.exercise if snapshot else None,
+            'source': self.source,
+            'running': state == 'running',
+            'state': state,
+            'error': str(self.error) if self.error is not None else None,
+            'rep_count': snapshot.reps if snapshot else 0,
+            'stage': snapshot.stage if snapshot else None,
+            'angles': list(snapshot.angles) if snapshot else [],
+            'form_errors': snapshot.form_errors if snapshot else {},
+            'fps': snapshot.fps if snapshot else 0.0,
+            'frame': snapshot.frame if snapshot else 0,
+            'latency_ms': snapshot.latency_ms if snapshot else None,
+            'updated': datetime.fromtimestamp(snapshot.timestamp).isoformat() if snapshot else None,
+            'recording': str(self.recorder.path) if self.recorder else None,
+            'start_time': self.start_time.isoformat(),
+        }
+
+
+class LandmarkSession(Session):
+    """
+    Session fed landmark arrays by a client that runs pose estimation on
+    the device.
+
+    It runs no inference and has no thread of its own: frames are counted
+    by the request that delivers them, so one process can serve hundreds of
+    these. The session ends when stopped or after LANDMARK_IDLE_TIMEOUT
+    seconds without landmarks; SessionManager finishes idle sessions the
+    next time it looks at them.
+    """
+
+    def __init__(self, session_id, exercise_type, record=False):
+        super().__init__(session_id, exercise_type, LANDMARK_SOURCE, record)
+        self.video.close()
+        self.video = None
+        self.frames = 0
+        self.fps = 0.0
+        self.last_seen = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @property
+    def active(self):
+        return not self.stop_event.is_set() and not self.idle
+
+    @property
+    def idle(self):
+        """Whether no landmarks arrived for LANDMARK_IDLE_TIMEOUT seconds."""
+        return time.perf_counter() - self.last_seen >= config.LANDMARK_IDLE_TIMEOUT
+
+    @property
+    def state(self):
+        return 'running' if self.active else 'stopped'
+
+    def update(self, frames):
+        """
+        Count a batch of landmark frames, in order.
+
+        Args:
+            frames: Array of shape (N, 33, 4); frames with NaN values have no pose
+
+        Returns:
+            Number of reps completed in this batch
+        """
+        start = time.perf_counter()
+        with self._lock:
+            if self.stop_event.is_set():
+                return 0
+            if start > self.last_seen and self.frames:
+                rate = len(frames) / (start - self.last_seen)
+                self.fps += engine.FPS_SMOOTHING * (rate - self.fps)
+            self.last_seen = start
+            reps = self.counter.reps
+            for points in frames:
+                tick = time.perf_counter()
+                if np.isnan(points[0, 0]):
+                    points = None
+                self.counter.update(points)
+                self.timings.record('count', time.perf_counter() - tick)
+                if self.recorder is not None:
+                    self.recorder.write(points, self.counter)
+                self.frames += 1
+                self.snapshots.publish(engine.take_snapshot(self.counter, self.fps, self.frames,
+                                                            time.perf_counter() - start))
+            self.timings.record('latency', time.perf_counter() - start)
+            return self.counter.reps - reps
+
+    def finish(self):
+        with self._lock:
+            self.stop_event.set()
+            super().finish()
+
+
+class SessionManager:
+    """Starts, tracks and stops detection sessions on a worker pool."""
+
+    def __init__(self, max_sessions=None, display=None):
+        """
+        Args:
+            max_sessions: Maximum concurrently running sessions (default
+                config.MAX_SESSIONS)
+            display: Show a window per session (default config.DISPLAY_WINDOW)
+        """
+        self.max_sessions = max_sessions or config.MAX_SESSIONS
+        self.display = config.DISPLAY_WINDOW if display is None else display
+        self._executor = ThreadPoolExecutor(max_workers=self.max_sessions, thread_name_prefix='session')
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def start(self, exercise_type, source=None, session_id=None, record=False):
+        """
+        Start a detection session.
+
+        Args:
+            exercise_type: Exercise type, or a list of them for auto-detection
+            source: Camera index or path (default config.CAMERA_INDEX),
+                sources.PUSH_SOURCE for frames pushed by the client, or
+                LANDMARK_SOURCE for landmarks pushed by the client
+            session_id: Optional ID; a random one is generated if omitted
+            record: Record every frame to a file in config.RECORDING_DIR
+
+        Returns:
+            The started Session
+
+        Raises:
+            InvalidSessionIdError: If the ID does not match SESSION_ID_PATTERN
+            InvalidSourceError: If the camera index or path cannot be used
+            SessionConflictError: If the ID or source is used by a running session
+            SessionLimitError: If max_sessions sessions (or
+                config.MAX_LANDMARK_SESSIONS landmark sessions) are already running
+        """
+        source = config.CAMERA_INDEX if source is None else source
+        session_id = session_id or uuid.uuid4().hex[:12]
+        if not isinstance(session_id, str) or not SESSION_ID_PATTERN.fullmatch(session_id):
+            raise InvalidSessionIdError(
+                f"Invalid session ID {session_id!r}: use 1-64 letters, digits, '_' or '-'")
+        if source not in (LANDMARK_SOURCE, sources.PUSH_SOURCE):
+            try:
+                sources.check_source(source)
+            except ValueError as e:
+                raise InvalidSourceError(str(e)) from e
+        with self._lock:
+            active = [session for session in self._sessions.values() if session.active]
+            if any(session.id == session_id for session in active):
+                raise SessionConflictError(f"Session {session_id} is already running")
+            if source == LANDMARK_SOURCE:
+                return self._start_landmarks(exercise_type, session_id, active, record)
+            active = [session for session in active if not isinstance(session, LandmarkSession)]
+            if source != sources.PUSH_SOURCE and any(session.source == source for session in active):
+                raise SessionConflictError(f"Source {source} is already in use")
+            if len(active) >= self.max_sessions:
+                raise SessionLimitError(f"All {self.max_sessions} session slots are in use")
+
+            self._prune_stopped()
+            session = Session(session_id, exercise_type, source, record)
+            self._sessions[session_id] = session
+            session.future = self._executor.submit(self._run, session)
+        logger.info(f"Started session {session_id}: {exercise_type} on source {source}")
+        return session
+
+    def _start_landmarks(self, exercise_type, session_id, active, record):
+        if sum(isinstance(session, LandmarkSession) for session in active) >= config.MAX_LANDMARK_SESSIONS:
+            raise SessionLimitError(f"All {config.MAX_LANDMARK_SESSIONS} landmark session slots are in use")
+        # Landmark sessions come and go with clients; forget the ended ones
+        for ended in [session for session in self._sessions.values()
+                      if isinstance(session, LandmarkSession) and not session.active]:
+            del self._sessions[ended.id]
+            ended.finish()
+        session = LandmarkSession(session_id, exercise_type, record)
+        self._sessions[session_id] = session
+        logger.info(f"Started landmark session {session_id}: {exercise_type}")
+        return session
+
+    def _prune_stopped(self):
+        # Keep the final status of the most recent stopped sessions only; their
+        # streams and recordings were closed when their worker finished
+        stopped = sorted((session for session in self._sessions.values()
+                          if not isinstance(session, LandmarkSession) and not session.active),
+                         key=lambda session: session.start_time, reverse=True)
+        for ended in stopped[config.MAX_STOPPED_SESSIONS:]:
+            del self._sessions[ended.id]
+
+    def _run(self, session):
+        try:
+            engine.run_detection(session.exercise_type, session.push_source or session.source, self.display,
+                                 session.counter, session.stop_event, session.snapshots, session.video,
+                                 session.recorder, session.timings)
+        except Exception as e:
+            session.error = e
+            logger.error(f"Session {session.id} failed: {e}", exc_info=True)
+        finally:
+            session.finish()
+
+    def get(self, session_id):
+        """
+        Returns:
+            The Session with this ID, or None
+        """
+        session = self._sessions.get(session_id)
+        if session is not None:
+            self._finish_idle([session])
+        return session
+
+    def list(self):
+        """
+        Returns:
+            List of all sessions, most recent first
+        """
+        self._finish_idle(list(self._sessions.values()))
+        return sorted(self._sessions.values(), key=lambda session: session.start_time, reverse=True)
+
+    def active_count(self):
+        """Number of sessions occupying a worker."""
+        return sum(session.active for session in self._sessions.values()
+                   if not isinstance(session, LandmarkSession))
+
+    def landmark_count(self):
+        """Number of active landmark sessions."""
+        self._finish_idle(list(self._sessions.values()))
+        return sum(session.active for session in self._sessions.values()
+                   if isinstance(session, LandmarkSession))
+
+    @staticmethod
+    def _finish_idle(sessions):
+        # Idle landmark sessions have no worker to end them; close their
+        # streams and recording as soon as they are noticed
+        for session in sessions:
+            if isinstance(session, LandmarkSession) and not session.stop_event.is_set() and session.idle:
+                session.finish()
+                logger.info(f"Landmark session {session.id} ended after "
+                            f"{config.LANDMARK_IDLE_TIMEOUT}s without landmarks")
+
+    def stop(self, session_id, timeout=None):
+        """
+        Stop a session and wait for it to release its resources.
+
+        Args:
+            session_id: Session to stop
+            timeout: Seconds to wait (default config.SESSION_STOP_TIMEOUT)
+
+        Returns:
+            Tuple of (Session, whether it stopped within the timeout), or
+            None if no running session has this ID. Landmark sessions that
+            went idle but were not stopped yet are finished and returned too,
+            so clients can always close their recording.
+        """
+        session = self._sessions.get(session_id)
+        if isinstance(session, LandmarkSession):
+            if session.stop_event.is_set():
+                return None
+            session.finish()
+            logger.info(f"Stopped landmark session {session_id}")
+            return session, True
+        if session is None or session.state != 'running':
+            return None
+        timeout = config.SESSION_STOP_TIMEOUT if timeout is None else timeout
+        session.stop_event.set()
+        stopped = self._wait(session, timeout)
+        if stopped:
+            logger.info(f"Stopped session {session_id}")
+        else:
+            logger.warning(f"Session {session_id} did not stop within {timeout}s")
+        return session, stopped
+
+    @staticmethod
+    def _wait(session, timeout):
+        try:
+            session.future.exception(timeout)
+        except TimeoutError:
+            return False
+        return True
+
+    def shutdown(self, timeout=None):
+        """Stop all sessions, waiting up to timeout in total, and release the pool."""
+        timeout = config.SESSION_STOP_TIMEOUT if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        for session in self._sessions.values():
+            session.stop_event.set()
+        for session in self._sessions.values():
+            if isinstance(session, LandmarkSession):
+                session.finish()
+            else:
+                self._wait(session, max(deadline - time.monotonic(), 0.0))
+        self._executor.shutdown(wait=False)
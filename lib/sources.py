@@ -0,0 +1,323 @@
+"""
+Frame sources for exercise detection.
+Webcams, video files, image directories, in-memory frame streams and
+frames pushed by API clients behind the cv2.VideoCapture read() interface
+used by pipeline.FramePipeline.
+"""
+import logging
+import threading
+import time
+from pathlib import Path
+import cv2
+import numpy as np
+import config
+import pipeline
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp'}
+
+# Source name that makes a session take its frames from API clients
+PUSH_SOURCE = 'push'
+
+# Encodings accepted by PushSource.push
+PUSH_ENCODINGS = ('image', 'raw')
+
+
+class FrameSource:
+    """
+    Base class for frame sources.
+
+    realtime is True for live sources, whose frames may be dropped when
+    processing falls behind, and False for recorded sources, which must be
+    processed frame by frame.
+    """
+    realtime = False
+    fps = 30.0
+
+    def isOpened(self):
+        return False
+
+    def read(self):
+        """
+        Returns:
+            Tuple of (success, BGR frame or None); a live source may return
+            (True, None) when no frame has arrived yet
+        """
+        return False, None
+
+    def release(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class CaptureSource(FrameSource):
+    """Source backed by cv2.VideoCapture (webcam or video file)."""
+
+    def __init__(self, target, realtime):
+        self.cap = cv2.VideoCapture(target)
+        self.realtime = realtime
+        self.name = str(target)
+        fps = self.cap.get(cv2.CAP_PROP_FPS) if self.cap.isOpened() else 0
+        self.fps = fps if fps and fps > 0 else FrameSource.fps
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self):
+        return self.cap.read()
+
+    def release(self):
+        self.cap.release()
+
+
+class CameraSource(CaptureSource):
+    """Live webcam."""
+
+    def __init__(self, index=None):
+        super().__init__(config.CAMERA_INDEX if index is None else index, realtime=True)
+
+
+class VideoFileSource(CaptureSource):
+    """Recorded video file."""
+
+    def __init__(self, path):
+        super().__init__(str(path), realtime=False)
+
+
+class ImageDirectorySource(FrameSource):
+    """Directory of frame images, read in file name order."""
+
+    def __init__(self, path, fps=None):
+        self.name = str(path)
+        self.paths = sorted(p for p in Path(path).iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+        self.fps = fps or FrameSource.fps
+        self._index = 0
+
+    def isOpened(self):
+        return self._index < len(self.paths)
+
+    def read(self):
+        while self._index < len(self.paths):
+            path = self.paths[self._index]
+            self._index += 1
+            frame = cv2.imread(str(path))
+            if frame is not None:
+                return True, frame
+            logger.warning(f"Could not read image {path}")
+        return False, None
+
+    def release(self):
+        self._index = len(self.paths)
+
+
+class ArraySource(FrameSource):
+    """Stream of BGR frames from an iterable of NumPy arrays."""
+
+    def __init__(self, frames, fps=None, realtime=False):
+        self.name = '<array>'
+        self.fps = fps or FrameSource.fps
+        self.realtime = realtime
+        self._frames = iter(frames)
+        self._open = True
+
+    def isOpened(self):
+        return self._open
+
+    def read(self):
+        if self._open:
+            frame = next(self._frames, None)
+            if frame is not None:
+                return True, np.ascontiguousarray(frame)
+            self._open = False
+        return False, None
+
+    def release(self):
+        self._open = False
+
+
+class PushSource(FrameSource):
+    """
+    Live frames sent by a client, e.g. the phone camera of the Flutter app.
+
+    push() only queues the encoded bytes; frames are decoded by read() on
+    the pipeline's capture thread. The queue keeps the newest frames, so
+    when the server falls behind, stale frames are dropped before any
+    decode work is spent on them.
+    """
+    realtime = True
+
+    def __init__(self, queue_size=None, idle_timeout=None):
+        """
+        Args:
+            queue_size: Frames buffered before the oldest is dropped
+                (default config.INGEST_QUEUE_SIZE)
+            idle_timeout: Seconds without a frame after which the source
+                ends (default config.INGEST_IDLE_TIMEOUT)
+        """
+        self.name = PUSH_SOURCE
+        self.idle_timeout = idle_timeout or config.INGEST_IDLE_TIMEOUT
+        self.received = 0
+        self.decode_errors = 0
+        self.timestamp = None
+        self._queue = pipeline.DropOldestQueue(queue_size or config.INGEST_QUEUE_SIZE)
+        self._lock = threading.Lock()
+        self._last_push = time.perf_counter()
+
+    @property
+    def dropped(self):
+        """Frames discarded as stale before they were decoded."""
+        return self._queue.dropped
+
+    def push(self, data, encoding='image', shape=None):
+        """
+        Queue one frame.
+
+        Args:
+            data: Encoded image (JPEG, PNG, ...) or raw BGR bytes
+            encoding: 'image' or 'raw'
+            shape: (height, width) of a raw frame
+
+        Returns:
+            Sequence number of the frame, counting from 1
+
+        Raises:
+            ValueError: If the encoding is unknown or a raw frame does not
+                match its shape
+        """
+        if encoding not in PUSH_ENCODINGS:
+            raise ValueError(f"Unknown frame encoding: {encoding}")
+        if encoding == 'raw':
+            if shape is None or min(shape) <= 0 or len(data) != shape[0] * shape[1] * 3:
+                raise ValueError(f"Raw frame of {len(data)} bytes does not match shape {shape} x 3")
+        with self._lock:
+            self.received += 1
+            sequence = self.received
+        self._last_push = time.perf_counter()
+        self._queue.put((data, encoding, shape, self._last_push))
+        return sequence
+
+    def isOpened(self):
+        return not self._queue.closed
+
+    def read(self):
+        item = self._queue.get(pipeline.FramePipeline.POLL_INTERVAL)
+        if item is None:
+            if self._queue.closed or time.perf_counter() - self._last_push > self.idle_timeout:
+                if not self._queue.closed:
+                    logger.info(f"No frames pushed for {self.idle_timeout}s, ending push source")
+                    self._queue.close()
+                return False, None
+            return True, None
+
+        data, encoding, shape, received = item
+        if encoding == 'raw':
+            # Zero-copy view of the request body; the pipeline's flip makes
+            # the copy that travels downstream
+            frame = np.frombuffer(data, np.uint8).reshape(shape[0], shape[1], 3)
+        else:
+            frame = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+            if frame is None:
+                self.decode_errors += 1
+                logger.warning("Could not decode pushed frame")
+                return True, None
+        self.timestamp = received
+        return True, frame
+
+    def release(self):
+        self._queue.close()
+
+
+def split_frame_batch(data):
+    """
+    Split a batch upload into its frames.
+
+    A batch is a sequence of frames, each preceded by its length as a 4-byte
+    big-endian unsigned integer.
+
+    Args:
+        data: Batch bytes
+
+    Returns:
+        List of memoryviews, one per frame
+
+    Raises:
+        ValueError: If the batch is truncated
+    """
+    view = memoryview(data)
+    frames = []
+    offset = 0
+    while offset < len(view):
+        if offset + 4 > len(view):
+            raise ValueError("Truncated frame batch")
+        length = int.from_bytes(view[offset:offset + 4], 'big')
+        offset += 4
+        if offset + length > len(view):
+            raise ValueError("Truncated frame batch")
+        frames.append(view[offset:offset + length])
+        offset += length
+    return frames
+
+
+def check_source(target):
+    """
+    Check that a camera index or path names a source that can be opened.
+
+    Video files and image directories are opened and released; cameras are
+    not, since opening one may be slow and it may belong to another process
+    until the session starts.
+
+    Args:
+        target: Camera index (int or digit string), video file path or
+            image directory path
+
+    Raises:
+        ValueError: If the target is none of these or cannot be opened
+    """
+    if isinstance(target, FrameSource):
+        return
+    if isinstance(target, bool) or not isinstance(target, (int, str, Path)):
+        raise ValueError(f"Source must be a camera index or path, not {type(target).__name__}")
+    if isinstance(target, int):
+        if target < 0:
+            raise ValueError(f"Invalid camera index {target}")
+        return
+    if isinstance(target, str) and target.isdigit():
+        return
+    try:
+        source = open_source(target)
+    except OSError as e:
+        raise ValueError(str(e)) from e
+    with source:
+        if not source.isOpened():
+            raise ValueError(f"Could not open source {target}")
+
+
+def open_source(target):
+    """
+    Open a frame source from a camera index, path or frame iterable.
+
+    Args:
+        target: Camera index (int or digit string), video file path,
+            image directory path, or iterable of BGR frames
+
+    Returns:
+        FrameSource
+    """
+    if isinstance(target, FrameSource):
+        return target
+    if isinstance(target, int) or (isinstance(target, str) and target.isdigit()):
+        return CameraSource(int(target))
+    if isinstance(target, (str, Path)):
+        path = Path(target)
+        if path.is_dir():
+            return ImageDirectorySource(path)
+        if not path.exists():
+            raise FileNotFoundError(f"No such video file or directory: {path}")
+        return VideoFileSource(path)
+    return ArraySource(target)
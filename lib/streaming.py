@@ -0,0 +1,108 @@
+"""
+Annotated video streaming.
+Encodes a detection run's rendered frames to JPEG once per frame and
+shares the encoded buffer with every MJPEG viewer; nothing is rendered or
+encoded while nobody is watching.
+"""
+import logging
+import threading
+import cv2
+import config
+
+logger = logging.getLogger(__name__)
+
+BOUNDARY = 'frame'
+MIMETYPE = f'multipart/x-mixed-replace; boundary={BOUNDARY}'
+
+
+class FrameBroadcaster:
+    """
+    Latest-frame JPEG buffer shared by all viewers of one detection run.
+
+    Viewers always get the newest frame; a slow viewer skips frames instead
+    of queueing them, so it neither delays other viewers nor the run.
+    """
+
+    def __init__(self, quality=None, max_width=None):
+        """
+        Args:
+            quality: JPEG quality 1-100 (default config.STREAM_JPEG_QUALITY)
+            max_width: Frames wider than this are downscaled before encoding
+                (default config.STREAM_MAX_WIDTH; 0 keeps the full size)
+        """
+        self.quality = quality or config.STREAM_JPEG_QUALITY
+        self.max_width = config.STREAM_MAX_WIDTH if max_width is None else max_width
+        self.encoded_frames = 0
+        self._cond = threading.Condition()
+        self._jpeg = None
+        self._sequence = 0
+        self._viewers = 0
+        self._closed = False
+
+    @property
+    def wanted(self):
+        """Whether anyone is watching, i.e. frames should be rendered and published."""
+        return self._viewers > 0
+
+    @property
+    def viewers(self):
+        return self._viewers
+
+    def publish(self, image):
+        """
+        Encode a BGR frame and hand it to all viewers; no-op without viewers.
+
+        Args:
+            image: Annotated BGR frame
+        """
+        if not self._viewers:
+            return
+        height, width = image.shape[:2]
+        if self.max_width and width > self.max_width:
+            image = cv2.resize(image, (self.max_width, height * self.max_width // width),
+                               interpolation=cv2.INTER_AREA)
+        ok, jpeg = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            logger.warning("Could not encode frame for streaming")
+            return
+        with self._cond:
+            self._jpeg = jpeg.tobytes()
+            self._sequence += 1
+            self.encoded_frames += 1
+            self._cond.notify_all()
+
+    def close(self):
+        """End all viewer streams, e.g. when the run stops."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def stream(self, timeout=None):
+        """
+        Generate an MJPEG (multipart/x-mixed-replace) stream.
+
+        Args:
+            timeout: Seconds to wait for a frame before ending the stream
+                (default config.STREAM_TIMEOUT)
+
+        Yields:
+            Multipart chunks, one JPEG per part
+        """
+        timeout = timeout or config.STREAM_TIMEOUT
+        with self._cond:
+            self._viewers += 1
+            seen = self._sequence
+        try:
+            while True:
+                with self._cond:
+                    if not self._cond.wait_for(lambda: self._sequence != seen or self._closed, timeout):
+                        return
+                    if self._sequence == seen:
+                        return
+                    jpeg, seen = self._jpeg, self._sequence
+                yield (b'--' + BOUNDARY.encode() + b'\r\n'
+                       b'Content-Type: image/jpeg\r\n'
+                       b'Content-Length: ' + str(len(jpeg)).encode() + b'\r\n\r\n' + jpeg + b'\r\n')
+        finally:
+            with self._cond:
+                self._viewers -= 1
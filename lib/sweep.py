@@ -0,0 +1,232 @@
+"""
+Threshold sweep over recorded landmark tracks.
+Evaluates the rep counters for every combination in a threshold grid, for
+all clips at once, and reports rep-count accuracy against labeled ground
+truth.
+
+Usage:
+    python lib/sweep.py bicep_curls cache/landmarks --labels labels.json \\
+        --grid down_angle_min=130:160:5 up_angle_max=25:45:5
+"""
+import argparse
+import itertools
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+import numpy as np
+import counters
+import landmark_cache
+import utils
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on clips x combinations evaluated per chunk, to bound memory
+MAX_LANES = 2_000_000
+
+
+def parse_grid(specs):
+    """
+    Parse threshold grid arguments.
+
+    Args:
+        specs: Strings like 'name=130:160:5' (inclusive range) or 'name=30,35,40'
+
+    Returns:
+        Dict mapping threshold name to a list of values
+    """
+    grid = {}
+    for spec in specs:
+        name, _, values = spec.partition('=')
+        if not values:
+            raise ValueError(f"Invalid grid spec: {spec}")
+        if ':' in values:
+            start, stop, step = (float(v) for v in values.split(':'))
+            grid[name] = list(np.arange(start, stop + step / 2, step))
+        else:
+            grid[name] = [float(v) for v in values.split(',')]
+    return grid
+
+
+def clip_angles(tracks, triples):
+    """
+    Compute joint angles for a set of clips, padded to a common length.
+
+    Args:
+        tracks: List of (T_i, 33, D) landmark tracks, NaN rows for no pose
+        triples: Joint-index table from landmarks.joint_triples
+
+    Returns:
+        Array of shape (K, N, T_max); padded and pose-less frames are NaN
+    """
+    length = max((len(track) for track in tracks), default=0)
+    angles = np.full((len(triples), len(tracks), length), np.nan)
+    for i, track in enumerate(tracks):
+        if len(track):
+            angles[:, i, :len(track)] = utils.calculate_angles(np.asarray(track), triples).T
+    return angles
+
+
+def count_reps(exercise_type, angles, thresholds):
+    """
+    Run an exercise's stage rules for every clip and threshold combination
+    at once, with the same first-match semantics as counters.ExerciseCounter.
+
+    Args:
+        exercise_type: Exercise type, e.g. 'bicep_curls'
+        angles: Array of shape (K, N, T) from clip_angles
+        thresholds: Dict mapping threshold name to an array of shape (C,)
+
+    Returns:
+        Integer array of shape (N, C) with rep counts
+    """
+    exercise = counters.EXERCISES[exercise_type]
+    stages = [None] + sorted({rule.stage for rule in exercise.rules})
+    code = {stage: i for i, stage in enumerate(stages)}
+    rules = [(code[rule.stage], rule.when, None if rule.after is None else code[rule.after])
+             for rule in exercise.rules]
+    rep_from, rep_to = code[exercise.rep[0]], code[exercise.rep[1]]
+
+    _, clips, frames = angles.shape
+    combos = len(next(iter(thresholds.values())))
+    t = {name: np.asarray(values)[None, :] for name, values in thresholds.items()}
+    stage = np.zeros((clips, combos), dtype=np.int8)
+    reps = np.zeros((clips, combos), dtype=np.int32)
+    valid = ~np.isnan(angles).any(axis=0)
+
+    for frame in range(frames):
+        rows = valid[:, frame]
+        if not rows.any():
+            continue
+        a = angles[:, rows, frame][:, :, None]
+        current = stage[rows]
+        new = current.copy()
+        matched = np.zeros_like(current, dtype=bool)
+        for target, predicate, required in rules:
+            hit = predicate(a, t) & ~matched
+            if required is not None:
+                hit &= current == required
+            new[hit] = target
+            matched |= hit
+        reps[rows] += (current == rep_from) & (new == rep_to)
+        stage[rows] = new
+    return reps
+
+
+def sweep(exercise_type, tracks, labels, grid):
+    """
+    Evaluate every threshold combination in a grid against labeled clips.
+
+    Args:
+        exercise_type: Exercise type, e.g. 'bicep_curls'
+        tracks: List of landmark tracks
+        labels: Expected rep count per track, same order
+        grid: Dict mapping threshold name to candidate values; thresholds not
+            in the grid keep their config values
+
+    Returns:
+        List of result dicts (thresholds, accuracy, mean_abs_error), best first
+    """
+    exercise = counters.EXERCISES[exercise_type]
+    unknown = set(grid) - set(exercise.thresholds)
+    if unknown:
+        raise ValueError(f"Unknown thresholds for {exercise_type}: {sorted(unknown)}")
+
+    names = list(exercise.thresholds)
+    axes = [grid.get(name, [exercise.thresholds[name]]) for name in names]
+    combos = np.array(list(itertools.product(*axes)), dtype=float).reshape(-1, len(names))
+    angles = clip_angles(tracks, exercise.triples)
+    expected = np.asarray(labels)[:, None]
+
+    chunk = max(1, MAX_LANES // max(len(tracks), 1))
+    accuracy = np.empty(len(combos))
+    mae = np.empty(len(combos))
+    for start in range(0, len(combos), chunk):
+        block = combos[start:start + chunk]
+        reps = count_reps(exercise_type, angles, {name: block[:, i] for i, name in enumerate(names)})
+        accuracy[start:start + chunk] = (reps == expected).mean(axis=0)
+        mae[start:start + chunk] = np.abs(reps - expected).mean(axis=0)
+
+    order = np.lexsort((mae, -accuracy))
+    return [
+        {
+            'thresholds': {name: float(combos[i, j]) for j, name in enumerate(names)},
+            'accuracy': float(accuracy[i]),
+            'mean_abs_error': float(mae[i]),
+        }
+        for i in order
+    ]
+
+
+def load_tracks(directory, labels, settings=None):
+    """
+    Load the landmark tracks that have a label.
+
+    Tracks are .npy files; a track's id is its file stem, or the stem of the
+    source video recorded in a landmark cache .json sidecar. Cache entries
+    extracted with other model settings, unfinished cache writes and
+    further tracks of an already loaded clip are skipped.
+
+    Args:
+        directory: Directory of .npy tracks (e.g. the landmark cache)
+        labels: Dict mapping track id to expected rep count
+        settings: Model settings cache entries must have been extracted
+            with (default landmark_cache.model_settings())
+
+    Returns:
+        Tuple of (ids, tracks, expected rep counts)
+    """
+    settings = landmark_cache.model_settings() if settings is None else settings
+    ids, tracks, expected = [], [], []
+    for path in sorted(Path(directory).glob('*.npy')):
+        if path.name.endswith('.tmp.npy'):
+            continue
+        clip_id = path.stem
+        meta_path = path.with_suffix('.json')
+        if meta_path.exists():
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if 'settings' in meta and meta['settings'] != settings:
+                continue
+            clip_id = Path(meta.get('source', clip_id)).stem
+        if clip_id in ids:
+            logger.warning(f"Skipping {path}: clip {clip_id} is already loaded")
+            continue
+        if clip_id in labels:
+            ids.append(clip_id)
+            tracks.append(np.load(path, mmap_mode='r'))
+            expected.append(labels[clip_id])
+    return ids, tracks, expected
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grid-search counter thresholds over labeled landmark tracks")
+    parser.add_argument('exercise', choices=sorted(counters.EXERCISES), help="Exercise type")
+    parser.add_argument('tracks', help="Directory of .npy landmark tracks (e.g. the landmark cache)")
+    parser.add_argument('--labels', required=True, help="JSON file mapping clip id to expected reps")
+    parser.add_argument('--grid', nargs='+', default=[], help="Threshold ranges, e.g. up_angle_max=25:45:5")
+    parser.add_argument('--top', type=int, default=10, help="Number of best combinations to report")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    with open(args.labels) as f:
+        labels = json.load(f)
+    ids, tracks, expected = load_tracks(args.tracks, labels)
+    if not tracks:
+        logger.error(f"No labeled tracks found in {args.tracks}")
+        return 1
+
+    start = time.perf_counter()
+    results = sweep(args.exercise, tracks, expected, parse_grid(args.grid))
+    elapsed = time.perf_counter() - start
+    logger.info(f"Evaluated {len(results)} combinations over {len(tracks)} clips in {elapsed:.2f}s")
+
+    json.dump({'clips': ids, 'combinations': len(results), 'elapsed_s': elapsed,
+               'best': results[:args.top]}, sys.stdout, indent=2)
+    print()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
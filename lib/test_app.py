@@ -0,0 +1,296 @@
+"""
+HTTP API checks for pytest, using the Flask test client.
+
+Sessions run on a PosePool whose fake Pose finds no pose in any frame, so
+camera and push sessions run their whole pipeline without MediaPipe;
+landmark sessions are fed the replay fixtures.
+
+Usage:
+    python -m pytest lib
+"""
+import threading
+import time
+import types
+import cv2
+import numpy as np
+import pytest
+import app
+import audio
+import config
+import pose_pool
+import recording
+import replay
+
+BICEP_FIXTURE = config.REPLAY_FIXTURE_DIR / 'bicep_curls.json'
+
+
+class FakePose:
+    """Stands in for mediapipe's Pose; detects nothing."""
+
+    def __init__(self):
+        self.frames = 0
+        self.closed = False
+
+    def process(self, image):
+        self.frames += 1
+        return types.SimpleNamespace(pose_landmarks=None)
+
+    def reset(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def poses(monkeypatch):
+    created = []
+
+    def factory(settings):
+        pose = FakePose()
+        created.append(pose)
+        return pose
+
+    monkeypatch.setattr(pose_pool, '_pool', pose_pool.PosePool(factory=factory))
+    return created
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path, poses):
+    monkeypatch.setattr(app.session_manager, 'display', False)
+    monkeypatch.setattr(audio, '_player', audio.AudioPlayer(audio.NullBackend()))
+    monkeypatch.setattr(config, 'RECORDING_DIR', tmp_path / 'recordings')
+    yield app.app.test_client()
+    for session in app.session_manager.list():
+        app.session_manager.stop(session.id)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def start_session(client, session_id, source, **body):
+    response = client.post('/sessions', json={'exercise': 'bicep_curls', 'session_id': session_id,
+                                              'source': source, **body})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def push_frame(client, session_id):
+    frame = np.zeros((48, 64, 3), np.uint8)
+    return client.post(f'/sessions/{session_id}/frames?width=64&height=48', data=frame.tobytes(),
+                       content_type='application/octet-stream')
+
+
+@pytest.mark.parametrize('endpoint', ['/stop', '/sessions', '/bicep_curls', '/auto'])
+@pytest.mark.parametrize('body', [[1, 2], 'default', 3])
+def test_json_body_must_be_an_object(client, endpoint, body):
+    response = client.post(endpoint, json=body)
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Bad request'
+
+
+def test_invalid_json_is_ignored(client):
+    response = client.post('/stop', data='{', content_type='application/json')
+    assert response.status_code == 400
+    assert response.get_json() == {'status': 'No exercise is currently running'}
+
+
+def test_landmark_session_counts_reps(client):
+    fixture, track = replay.load_fixture(BICEP_FIXTURE)
+    started = start_session(client, 'lm-count', 'landmarks', record=True)
+    reps = 0
+    for batch in np.array_split(track, 4):
+        response = client.post('/sessions/lm-count/landmarks', data=batch.tobytes(),
+                               content_type='application/octet-stream')
+        assert response.status_code == 200
+        reps += response.get_json()['reps_completed']
+    assert reps == fixture['expected']['reps']
+
+    response = client.delete('/sessions/lm-count')
+    assert response.status_code == 200
+    assert response.get_json()['final_rep_count'] == fixture['expected']['reps']
+    assert client.get('/sessions/lm-count').get_json()['state'] == 'stopped'
+    assert client.delete('/sessions/lm-count').status_code == 404
+    assert len(recording.Recording(started['recording']).track()) == len(track)
+
+
+def test_landmark_float16(client):
+    start_session(client, 'lm-half', 'landmarks')
+    frames = np.zeros((3, 33, 4), np.float16)
+    response = client.post('/sessions/lm-half/landmarks?dtype=float16', data=frames.tobytes(),
+                           content_type='application/octet-stream')
+    assert response.status_code == 200
+    assert response.get_json()['frames_counted'] == 3
+
+
+@pytest.mark.parametrize('data, query, status', [
+    (b'', '', 400),
+    (b'\0' * 100, '', 400),
+    (b'\0' * 528, '?dtype=float64', 400),
+    (b'\0' * 528 * 301, '', 413),
+])
+def test_bad_landmark_bodies(client, data, query, status):
+    start_session(client, 'lm-bad', 'landmarks')
+    response = client.post(f'/sessions/lm-bad/landmarks{query}', data=data,
+                           content_type='application/octet-stream')
+    assert response.status_code == status
+    assert 'error' in response.get_json()
+
+
+def test_oversized_body(client, monkeypatch):
+    monkeypatch.setitem(app.app.config, 'MAX_CONTENT_LENGTH', 1000)
+    start_session(client, 'lm-big', 'landmarks')
+    response = client.post('/sessions/lm-big/landmarks', data=b'\0' * 528 * 2,
+                           content_type='application/octet-stream')
+    assert response.status_code == 413
+    assert response.get_json()['error'] == 'Upload too large'
+
+
+def test_landmarks_need_a_landmark_session(client):
+    start_session(client, 'push-lm', 'push')
+    response = client.post('/sessions/push-lm/landmarks', data=b'\0' * 528,
+                           content_type='application/octet-stream')
+    assert response.status_code == 409
+    assert client.post('/sessions/missing/landmarks', data=b'\0' * 528).status_code == 404
+
+
+def test_idle_landmark_session_ends(client, monkeypatch):
+    started = start_session(client, 'lm-idle', 'landmarks', record=True)
+    client.post('/sessions/lm-idle/landmarks', data=np.zeros((2, 33, 4), np.float32).tobytes(),
+                content_type='application/octet-stream')
+    monkeypatch.setattr(config, 'LANDMARK_IDLE_TIMEOUT', 0.05)
+    time.sleep(0.1)
+
+    assert client.get('/sessions/lm-idle').get_json()['state'] == 'stopped'
+    assert len(recording.Recording(started['recording']).track()) == 2
+    response = client.post('/sessions/lm-idle/landmarks', data=b'\0' * 528,
+                           content_type='application/octet-stream')
+    assert response.status_code == 404
+
+
+def test_idle_landmark_session_can_be_stopped(client, monkeypatch):
+    started = start_session(client, 'lm-idle-stop', 'landmarks', record=True)
+    monkeypatch.setattr(config, 'LANDMARK_IDLE_TIMEOUT', 0.05)
+    time.sleep(0.1)
+    # Stopping closes the recording even though the session already timed out
+    session = app.session_manager._sessions['lm-idle-stop']
+    assert not session.stop_event.is_set()
+    response = client.delete('/sessions/lm-idle-stop')
+    assert response.status_code == 200
+    assert session.recorder._file.closed
+    assert recording.Recording(started['recording']).track().shape == (0, 33, 4)
+
+
+def test_push_session_processes_frames(client, poses):
+    start_session(client, 'push', 'push')
+    assert wait_for(lambda: push_frame(client, 'push').status_code == 202
+                    and client.get('/sessions/push').get_json()['frame'] >= 3)
+    response = client.delete('/sessions/push')
+    assert response.status_code == 200
+    assert response.get_json()['stopped']
+    assert sum(pose.frames for pose in poses) >= 3
+
+
+def test_push_frame_errors(client):
+    start_session(client, 'push-bad', 'push')
+    response = client.post('/sessions/push-bad/frames', data=b'abc', content_type='text/plain')
+    assert response.status_code == 415
+    response = client.post('/sessions/push-bad/frames?width=64&height=48', data=b'abc',
+                           content_type='application/octet-stream')
+    assert response.status_code == 400
+    start_session(client, 'lm-frames', 'landmarks')
+    assert push_frame(client, 'lm-frames').status_code == 409
+
+
+@pytest.mark.parametrize('source', ['missing.mp4', [1], -1, 'empty-dir', 'broken.mp4'])
+def test_bad_source_is_rejected(client, tmp_path, source):
+    if source == 'empty-dir':
+        source = str(tmp_path)
+    elif source == 'broken.mp4':
+        source = tmp_path / source
+        source.write_bytes(b'not a video')
+        source = str(source)
+    response = client.post('/sessions', json={'exercise': 'bicep_curls', 'session_id': 'bad-source',
+                                              'source': source})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Invalid source'
+    assert app.session_manager.get('bad-source') is None
+
+
+def test_failed_session_reports_error(client, tmp_path, monkeypatch):
+    def broken(settings):
+        raise RuntimeError("model failed to load")
+
+    monkeypatch.setattr(pose_pool, '_pool', pose_pool.PosePool(factory=broken))
+    cv2.imwrite(str(tmp_path / '000.png'), np.zeros((48, 64, 3), np.uint8))
+    start_session(client, 'failing', str(tmp_path))
+
+    assert wait_for(lambda: not app.session_manager.get('failing').active)
+    status = client.get('/sessions/failing').get_json()
+    assert status['state'] == 'failed'
+    assert status['error'] == 'model failed to load'
+
+
+def test_image_directory_session_runs_to_the_end(client, tmp_path, poses):
+    for i in range(5):
+        cv2.imwrite(str(tmp_path / f'{i:03d}.png'), np.zeros((48, 64, 3), np.uint8))
+    start_session(client, 'images', str(tmp_path))
+
+    assert wait_for(lambda: not app.session_manager.get('images').active)
+    status = client.get('/sessions/images').get_json()
+    assert status['state'] == 'stopped'
+    assert status['error'] is None
+    assert status['frame'] == 5
+
+
+def test_event_stream(client):
+    fixture, track = replay.load_fixture(BICEP_FIXTURE)
+    start_session(client, 'events', 'landmarks')
+    client.post('/sessions/events/landmarks', data=track[:1].tobytes(), content_type='application/octet-stream')
+
+    response = client.get('/sessions/events/events', buffered=False)
+    assert response.mimetype == 'text/event-stream'
+    chunks = iter(response.response)
+    assert next(chunks).startswith(b'event: snapshot')
+    client.post('/sessions/events/landmarks', data=track[1:].tobytes(), content_type='application/octet-stream')
+    client.delete('/sessions/events')
+    body = b''.join(chunks).decode()
+    response.close()
+
+    assert body.count('event: rep\n') == fixture['expected']['reps']
+    assert body.rstrip().split('\n\n')[-1].startswith('event: end')
+
+
+def test_video_stream(client):
+    start_session(client, 'video', 'push')
+    pushing = threading.Event()
+
+    def push():
+        while not pushing.wait(0.02):
+            push_frame(app.app.test_client(), 'video')
+
+    pusher = threading.Thread(target=push, daemon=True)
+    pusher.start()
+    try:
+        response = client.get('/sessions/video/video', buffered=False)
+        assert response.mimetype == 'multipart/x-mixed-replace'
+        chunk = next(iter(response.response))
+        response.close()
+    finally:
+        pushing.set()
+        pusher.join()
+
+    assert chunk.startswith(b'--frame\r\nContent-Type: image/jpeg')
+    jpeg = chunk.split(b'\r\n\r\n', 1)[1]
+    assert jpeg.startswith(b'\xff\xd8')
+
+
+def test_landmark_session_has_no_video(client):
+    start_session(client, 'lm-video', 'landmarks')
+    assert client.get('/sessions/lm-video/video').status_code == 409
@@ -0,0 +1,92 @@
+"""
+Recording round-trip checks for pytest: every replay fixture is recorded
+with RecordingWriter and read back with Recording.
+
+Usage:
+    python -m pytest lib
+"""
+import numpy as np
+import pytest
+import counters
+import recording
+import replay
+
+FIXTURES = replay.find_fixtures()
+
+
+def record_fixture(path, output, quantize):
+    """
+    Record a fixture's track frame by frame.
+
+    Returns:
+        Tuple of (track, dict of per-frame counter state lists)
+    """
+    fixture, track = replay.load_fixture(path)
+    counter = counters.create_counter(fixture['exercise'])
+    state = {'reps': [], 'stage': [], 'form_errors': []}
+    with recording.RecordingWriter(output, counter, quantize=quantize) as writer:
+        for points in track:
+            points = None if np.isnan(points[0, 0]) else points
+            counter.update(points)
+            writer.write(points, counter)
+            state['reps'].append(counter.reps)
+            state['stage'].append(counter.stage)
+            state['form_errors'].append(dict(counter.form_errors))
+    return track, state
+
+
+@pytest.mark.parametrize('quantize', [True, False], ids=['int16', 'float32'])
+@pytest.mark.parametrize('path', FIXTURES, ids=[path.stem for path in FIXTURES])
+def test_round_trip(path, quantize, tmp_path):
+    track, state = record_fixture(path, tmp_path / f'{path.stem}.exrec', quantize)
+    loaded = recording.Recording(tmp_path / f'{path.stem}.exrec')
+
+    assert len(loaded) == len(track)
+    assert loaded.header['quantized'] == quantize
+    assert loaded.reps.tolist() == state['reps']
+    assert loaded.stage_names() == state['stage']
+    for name in loaded.form_errors:
+        assert loaded.form_error_mask(name).tolist() == [errors[name] for errors in state['form_errors']]
+
+    result = loaded.track()
+    no_pose = np.isnan(track).any(axis=(1, 2))
+    assert (np.isnan(result).any(axis=(1, 2)) == no_pose).all()
+    assert np.isnan(result[no_pose]).all()
+    error = np.abs(result[~no_pose] - track[~no_pose])
+    assert error.max(initial=0.0) <= (1.0 / loaded.header['quant_scale'] if quantize else 0.0)
+
+    events = loaded.events
+    reps = np.array(state['reps'])
+    assert (((events & recording.EVENT_NO_POSE) != 0) == no_pose).all()
+    assert (((events & recording.EVENT_REP) != 0) == (reps != np.concatenate([[0], reps[:-1]]))).all()
+    stage_changes = [stage != previous for previous, stage in zip([None] + state['stage'], state['stage'])]
+    assert (((events & recording.EVENT_STAGE) != 0) == stage_changes).all()
+    onsets = [any(active and not previous.get(name) for name, active in errors.items())
+              for previous, errors in zip([{}] + state['form_errors'], state['form_errors'])]
+    assert (((events & recording.EVENT_FORM_ERROR) != 0) == onsets).all()
+
+
+def test_form_error_bits(tmp_path):
+    # The round trip only means something for form errors if one is raised
+    path = next(path for path in FIXTURES if path.stem == 'shoulder_press')
+    record_fixture(path, tmp_path / 'press.exrec', True)
+    loaded = recording.Recording(tmp_path / 'press.exrec')
+
+    mask = loaded.form_error_mask('hands_too_low')
+    bit = 1 << loaded.form_errors.index('hands_too_low')
+    assert mask.any()
+    assert ((loaded.records['form_errors'] == bit) == mask).all()
+
+
+def test_summary_and_partial_record(tmp_path):
+    path = next(path for path in FIXTURES if path.stem == 'bicep_curls_pose_lost')
+    output = tmp_path / 'clip.exrec'
+    track, state = record_fixture(path, output, True)
+    with open(output, 'ab') as f:
+        f.write(b'\0' * 100)  # a record cut short by a crash
+
+    loaded = recording.Recording(output)
+    summary = loaded.summary()
+    assert summary['frames'] == len(track)
+    assert summary['reps'] == state['reps'][-1]
+    assert summary['no_pose_frames'] == int(np.isnan(track).any(axis=(1, 2)).sum())
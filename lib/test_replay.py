@@ -0,0 +1,35 @@
+"""
+Replay fixture checks for pytest.
+Runs every fixture in config.REPLAY_FIXTURE_DIR through replay.check_fixture
+and replay.check_policies, the same checks as `python lib/replay.py check`
+and `python lib/replay.py policies`.
+
+Usage:
+    python -m pytest lib
+"""
+import json
+import pytest
+import counters
+import replay
+
+FIXTURES = replay.find_fixtures()
+
+
+@pytest.mark.parametrize('path', FIXTURES, ids=[path.stem for path in FIXTURES])
+def test_fixture(path):
+    result = replay.check_fixture(path)
+    assert result['passed'], result['mismatches']
+
+
+@pytest.mark.parametrize('path', FIXTURES, ids=[path.stem for path in FIXTURES])
+def test_scheduling_policies(path):
+    for result in replay.check_policies(path):
+        assert result['match'], result
+
+
+def test_every_exercise_has_a_fixture():
+    covered = set()
+    for path in FIXTURES:
+        with open(path) as f:
+            covered.add(json.load(f)['exercise'])
+    assert set(counters.EXERCISES) <= covered
@@ -0,0 +1,45 @@
+"""
+Checks for pytest that the vectorized sweep counts the same reps as
+counters.ExerciseCounter.
+
+Every fixture track, plus a copy with random frames lost, is counted for
+every exercise over a random grid of thresholds around the config values.
+
+Usage:
+    python -m pytest lib
+"""
+import numpy as np
+import pytest
+import counters
+import replay
+import score
+import sweep
+
+COMBOS = 12
+SPREAD = 25.0  # degrees around each config threshold
+
+
+def fixture_tracks(rng):
+    tracks = [replay.load_fixture(path)[1] for path in replay.find_fixtures()]
+    lost = []
+    for track in tracks:
+        track = track.copy()
+        track[rng.random(len(track)) < 0.1] = np.nan
+        lost.append(track)
+    return tracks + lost
+
+
+@pytest.mark.parametrize('exercise_type', sorted(counters.EXERCISES))
+def test_count_reps_matches_counter(exercise_type):
+    rng = np.random.default_rng(0)
+    exercise = counters.EXERCISES[exercise_type]
+    tracks = fixture_tracks(rng)
+    grid = {name: np.round(value + rng.uniform(-SPREAD, SPREAD, COMBOS))
+            for name, value in exercise.thresholds.items()}
+
+    reps = sweep.count_reps(exercise_type, sweep.clip_angles(tracks, exercise.triples), grid)
+
+    for combo in range(COMBOS):
+        thresholds = {name: float(values[combo]) for name, values in grid.items()}
+        expected = [score.score_track(exercise_type, track, thresholds=thresholds)['reps'] for track in tracks]
+        assert reps[:, combo].tolist() == expected, thresholds
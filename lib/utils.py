@@ -29,6 +29,44 @@ def calculate_angle(a, b, c):
     
     return angle
 
+def build_triples(triples):
+    """
+    Build a joint-index table for calculate_angles.
+    
+    Args:
+        triples: Sequence of (a, b, c) landmark indices, b being the vertex
+    
+    Returns:
+        Integer array of shape (K, 3)
+    """
+    return np.array([[int(a), int(b), int(c)] for a, b, c in triples], dtype=np.intp).reshape(-1, 3)
+
+def calculate_angles(landmarks, triples):
+    """
+    Calculate many joint angles in a single vectorized call.
+    
+    Works on one frame of shape (33, D) or on a whole clip of shape
+    (T, 33, D); only the x and y columns are used, so D may be 2, 3 or 4.
+    
+    Args:
+        landmarks: Landmark array of shape (33, D) or (T, 33, D)
+        triples: Joint-index table of shape (K, 3) from build_triples
+    
+    Returns:
+        Angles in degrees (0-180), shape (K,) for a frame or (T, K) for a clip
+    """
+    points = np.asarray(landmarks)
+    triples = np.asarray(triples)
+    a = points[..., triples[:, 0], :2]
+    b = points[..., triples[:, 1], :2]
+    c = points[..., triples[:, 2], :2]
+    
+    radians = (np.arctan2(c[..., 1] - b[..., 1], c[..., 0] - b[..., 0])
+               - np.arctan2(a[..., 1] - b[..., 1], a[..., 0] - b[..., 0]))
+    angles = np.abs(radians * 180.0 / np.pi)
+    
+    return np.where(angles > 180.0, 360 - angles, angles)
+
 def get_audio_path(filename):
     """
     Get cross-platform path to audio files.